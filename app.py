@@ -1,23 +1,50 @@
+import time
+startup_started = time.perf_counter()
 import os
-from flask import Flask, render_template, request, redirect, url_for, jsonify, flash, send_file
+import asyncio
+import atexit
+import uuid
+from flask import Flask, Response, g, render_template, request, redirect, url_for, jsonify, flash, send_file, stream_with_context
+from flask.cli import AppGroup
 from dotenv import load_dotenv
 from flask_bcrypt import Bcrypt
 from flask_login import LoginManager, login_user, login_required, logout_user, current_user
-from langid import classify as detect_language
-from google.cloud import translate_v2 as translate
-import google.generativeai as genai
 import logging
-import tempfile
-from gtts import gTTS
-import io
-import time
+import threading
 import json
+import random
+import click
+import sqlite3
 from datetime import datetime, timedelta
-from functools import wraps
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
 
 from extensions import db, bcrypt, login_manager, migrate
-from models import Admin, QA, ResponseFeedback, Conversation
+from models import Admin, QA, QATranslation, Conversation
 from forms import AdminLoginForm, AddQAForm, EditAdminForm
+from cache import build_cache, build_store, make_key
+from formatting import StreamingFormatter, append_follow_up, clean_answer
+from gemini_pool import CircuitBreaker, GeminiPool
+from translation_cache import TranslationCache
+from qa_index import QAIndex
+from semantic_cache import SemanticCache
+from write_behind import WriteBehindQueue
+from tts_cache import AudioCache, audio_key
+from speech import build_speech_service
+from export import FORMATS as EXPORT_FORMATS, TABLES as EXPORT_TABLES, parse_timestamp, stream_export
+from qa_listing import ensure_qa_fts, list_qas
+from qa_transfer import FORMATS as QA_FORMATS, export_qas, format_for, import_qas, read_records
+from rollups import apply_rollups, daily_counts, load_rollups, rebuild_rollups, summarize
+from metrics import Registry
+from profiling import SamplingProfiler
+from lazy import LazyResource
+from language import LanguageDetector, load_identifier, retag_conversations
+from session_context import SessionContextStore
+from prompts import SYSTEM_INSTRUCTION, build_prompt, token_usage
+
+# Time spent in each part of loading this module, logged once it is done
+startup_marks = [('imports', time.perf_counter())]
 
 # Load environment variables first
 load_dotenv()
@@ -25,8 +52,62 @@ load_dotenv()
 # Initialize Flask app
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your_default_secret_key')
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///database.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///database.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['RESPONSE_CACHE_MAX_ENTRIES'] = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 10000))
+app.config['RESPONSE_CACHE_MAX_BYTES'] = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+app.config['RESPONSE_CACHE_TTL'] = int(os.environ.get('RESPONSE_CACHE_TTL', 3600))
+app.config['CACHE_BACKEND'] = os.environ.get('CACHE_BACKEND', 'memory')
+app.config['CACHE_LOCAL_TTL'] = int(os.environ.get('CACHE_LOCAL_TTL', 60))
+app.config['CACHE_SQLITE_PATH'] = os.environ.get(
+    'CACHE_SQLITE_PATH', os.path.join(app.instance_path, 'response_cache.sqlite'))
+app.config['CACHE_REDIS_URL'] = os.environ.get('CACHE_REDIS_URL')
+app.config['UPSTREAM_TIMEOUT'] = float(os.environ.get('UPSTREAM_TIMEOUT', 20))
+app.config['UPSTREAM_MAX_CONCURRENCY'] = int(os.environ.get('UPSTREAM_MAX_CONCURRENCY', 64))
+app.config['GEMINI_MAX_CONCURRENCY'] = int(os.environ.get('GEMINI_MAX_CONCURRENCY', 16))
+app.config['GEMINI_TIMEOUT'] = float(os.environ.get('GEMINI_TIMEOUT', app.config['UPSTREAM_TIMEOUT']))
+app.config['GEMINI_BREAKER_THRESHOLD'] = int(os.environ.get('GEMINI_BREAKER_THRESHOLD', 5))
+app.config['GEMINI_BREAKER_RESET'] = float(os.environ.get('GEMINI_BREAKER_RESET', 30))
+app.config['TRANSLATION_MEMORY_SIZE'] = int(os.environ.get('TRANSLATION_MEMORY_SIZE', 5000))
+app.config['TRANSLATION_PREWARM_LANGUAGES'] = [
+    lang.strip() for lang in os.environ.get('TRANSLATION_PREWARM_LANGUAGES', 'es,pt,zh,ht,vi,fr,ar').split(',')
+    if lang.strip()
+]
+# Languages langid may answer with; empty means all 97 it knows
+app.config['DETECT_LANGUAGES'] = [
+    lang.strip() for lang in os.environ.get('DETECT_LANGUAGES', 'en,es,pt,zh,ht,vi,fr,ar').split(',')
+    if lang.strip()
+]
+app.config['LANGUAGE_CACHE_MAX_ENTRIES'] = int(os.environ.get('LANGUAGE_CACHE_MAX_ENTRIES', 10000))
+app.config['QA_MATCH_THRESHOLD'] = float(os.environ.get('QA_MATCH_THRESHOLD', 0.6))
+app.config['SEMANTIC_CACHE_THRESHOLD'] = float(os.environ.get('SEMANTIC_CACHE_THRESHOLD', 0.75))
+app.config['SEMANTIC_CACHE_DIM'] = int(os.environ.get('SEMANTIC_CACHE_DIM', 512))
+app.config['SEMANTIC_CACHE_PATH'] = os.environ.get(
+    'SEMANTIC_CACHE_PATH', os.path.join(app.instance_path, 'semantic_cache.npy'))
+app.config['QA_VERSION_CHECK_INTERVAL'] = float(os.environ.get('QA_VERSION_CHECK_INTERVAL', 10))
+app.config['SQLITE_CACHE_SIZE_KB'] = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64 * 1024))
+app.config['SQLITE_MMAP_SIZE'] = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+app.config['SPEECH_BACKENDS'] = [
+    name.strip() for name in os.environ.get('SPEECH_BACKENDS', 'gtts').split(',') if name.strip()
+]
+app.config['ESPEAK_PATH'] = os.environ.get('ESPEAK_PATH', 'espeak-ng')
+app.config['ESPEAK_SPEED'] = int(os.environ.get('ESPEAK_SPEED', 0)) or None
+app.config['TTS_CACHE_DIR'] = os.environ.get('TTS_CACHE_DIR', os.path.join(app.instance_path, 'tts_cache'))
+app.config['TTS_CACHE_MAX_BYTES'] = int(os.environ.get('TTS_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+app.config['TTS_PREGENERATE_TOP'] = int(os.environ.get('TTS_PREGENERATE_TOP', 50))
+app.config['WRITE_BEHIND_QUEUE_SIZE'] = int(os.environ.get('WRITE_BEHIND_QUEUE_SIZE', 10000))
+app.config['WRITE_BEHIND_INTERVAL_MS'] = int(os.environ.get('WRITE_BEHIND_INTERVAL_MS', 200))
+app.config['WRITE_BEHIND_BATCH_SIZE'] = int(os.environ.get('WRITE_BEHIND_BATCH_SIZE', 500))
+app.config['SESSION_CONTEXT_TURNS'] = int(os.environ.get('SESSION_CONTEXT_TURNS', 3))
+app.config['SESSION_CONTEXT_TTL'] = int(os.environ.get('SESSION_CONTEXT_TTL', 1800))
+app.config['SESSION_CONTEXT_MAX_SESSIONS'] = int(os.environ.get('SESSION_CONTEXT_MAX_SESSIONS', 10000))
+app.config['CONTEXT_MAX_TOKENS'] = int(os.environ.get('CONTEXT_MAX_TOKENS', 300))
+app.config['QUESTION_MAX_TOKENS'] = int(os.environ.get('QUESTION_MAX_TOKENS', 200))
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+app.config['PROFILE_INTERVAL_MS'] = float(os.environ.get('PROFILE_INTERVAL_MS', 10))
+app.config['PROFILE_TOKEN'] = os.environ.get('PROFILE_TOKEN')
+startup_marks.append(('config', time.perf_counter()))
 
 # Initialize extensions
 db.init_app(app)
@@ -36,37 +117,370 @@ login_manager.login_view = 'admin_login'
 
 migrate.init_app(app, db)
 
-# Initialize Google Cloud Translation client
-try:
-    translate_client = translate.Client.from_service_account_json(os.getenv("GOOGLE_APPLICATION_CREDENTIALS_JSON"))
-    logging.info("Translation client initialized successfully.")
-except Exception as e:
-    logging.error(f"Error initializing translation client: {e}")
-    exit(1)
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL lets readers run alongside the writer; NORMAL is durable enough under WAL"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    # Negative cache_size is in KiB rather than pages
+    cursor.execute(f"PRAGMA cache_size=-{app.config['SQLITE_CACHE_SIZE_KB']}")
+    cursor.execute(f"PRAGMA mmap_size={app.config['SQLITE_MMAP_SIZE']}")
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.close()
+
+startup_marks.append(('extensions', time.perf_counter()))
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+
+# Upstream clients and the language model are imported and built on first use,
+# so a cold start does not pay for them and a missing credential only disables
+# the feature that needs it
+def build_translate_client():
+    from google.cloud import translate_v2 as translate
+    return translate.Client.from_service_account_json(os.getenv("GOOGLE_APPLICATION_CREDENTIALS_JSON"))
 
-# Configure Gemini API
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
 if not GEMINI_API_KEY:
-    raise ValueError("No GEMINI_API_KEY set for the application")
-genai.configure(api_key=GEMINI_API_KEY)
+    logging.error("No GEMINI_API_KEY set; only stored answers can be served")
 
+def configure_gemini():
+    if not GEMINI_API_KEY:
+        raise RuntimeError("No GEMINI_API_KEY set for the application")
+    import google.generativeai as genai
+    genai.configure(api_key=GEMINI_API_KEY)
+    return genai
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
+translate_client = LazyResource('translation client', build_translate_client)
+gemini_sdk = LazyResource('Gemini SDK', configure_gemini)
+language_model = LazyResource('language model', lambda: load_identifier(app.config['DETECT_LANGUAGES']))
+language_detector = LanguageDetector(language_model, max_entries=app.config['LANGUAGE_CACHE_MAX_ENTRIES'])
+
+def detect_language(text):
+    """Language code of ``text``"""
+    return language_detector.detect(text)
+
+# Process-wide metrics, exported on /metrics. Each stage of answering a request
+# is timed with ``span``; gauges are read from their sources at scrape time
+metrics = Registry()
+request_seconds = metrics.histogram(
+    'chatbot_request_seconds', 'Time to build the response, by endpoint', ('endpoint',))
+requests_total = metrics.counter(
+    'chatbot_requests_total', 'HTTP responses by endpoint and status', ('endpoint', 'status'))
+stage_seconds = metrics.histogram(
+    'chatbot_stage_seconds', 'Time spent in each stage of handling a request', ('stage',))
+answer_lookups_total = metrics.counter(
+    'chatbot_answer_lookups_total',
+    'Where questions were answered from: response_cache, qa_index, database, semantic_cache, translation_variant '
+    'or miss',
+    ('result',))
+answers_total = metrics.counter(
+    'chatbot_answers_total', 'Answers sent, by source: database, gemini or error', ('source',))
+upstream_errors_total = metrics.counter(
+    'chatbot_upstream_errors_total', 'Failed calls to Gemini, Google Translate and speech backends', ('upstream',))
+gemini_tokens_total = metrics.counter(
+    'chatbot_gemini_tokens_total', 'Tokens Gemini reported, by kind: prompt or completion', ('kind',))
+
+def span(stage):
+    """Context manager timing one stage into chatbot_stage_seconds"""
+    return stage_seconds.time(stage=stage)
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.get('request_start')
+    if start is not None:
+        # Streamed bodies are still being generated at this point; their
+        # stages are covered by chatbot_stage_seconds
+        endpoint = request.endpoint or 'unknown'
+        request_seconds.observe(time.perf_counter() - start, endpoint=endpoint)
+        requests_total.inc(endpoint=endpoint, status=response.status_code)
+    return response
+
+# Opt-in sampling profiler: PROFILE_SAMPLE_RATE of requests (adjustable on
+# /admin/profiles), or any request carrying an X-Profile header from an admin
+profiler = SamplingProfiler(interval=app.config['PROFILE_INTERVAL_MS'] / 1000)
+
+def should_profile():
+    header = request.headers.get('X-Profile')
+    if header:
+        token = app.config['PROFILE_TOKEN']
+        return bool(token and header == token) or current_user.is_authenticated
+    rate = app.config['PROFILE_SAMPLE_RATE']
+    return rate > 0 and random.random() < rate
+
+@app.before_request
+def start_profiling():
+    if request.endpoint != 'static' and should_profile():
+        profiler.start(request.endpoint or 'unknown', request.path)
+        g.profiled = True
+
+@app.teardown_request
+def stop_profiling(exc):
+    # Runs once a streamed response has been sent, so the stream is included
+    if g.get('profiled'):
+        profiler.stop()
+
+# Answers keyed by normalised question and tagged by QA id: a bounded in-process
+# tier, optionally backed by a cache shared between workers (CACHE_BACKEND)
+response_cache = build_cache(
+    backend=app.config['CACHE_BACKEND'],
+    max_entries=app.config['RESPONSE_CACHE_MAX_ENTRIES'],
+    max_bytes=app.config['RESPONSE_CACHE_MAX_BYTES'],
+    default_ttl=app.config['RESPONSE_CACHE_TTL'],
+    local_ttl=app.config['CACHE_LOCAL_TTL'],
+    sqlite_path=app.config['CACHE_SQLITE_PATH'],
+    redis_url=app.config['CACHE_REDIS_URL']
+)
+
+# Recent turns per chat session for prompt context, so a Gemini call does not
+# first have to read them back from the conversation table. They are kept apart
+# from the response cache so sessions neither evict answers nor skew its stats
+session_context = SessionContextStore(
+    build_store(
+        'session_context',
+        backend=app.config['CACHE_BACKEND'],
+        max_entries=app.config['SESSION_CONTEXT_MAX_SESSIONS'],
+        default_ttl=app.config['SESSION_CONTEXT_TTL'],
+        sqlite_path=app.config['CACHE_SQLITE_PATH'],
+        redis_url=app.config['CACHE_REDIS_URL']
+    ),
+    max_turns=app.config['SESSION_CONTEXT_TURNS'],
+    ttl=app.config['SESSION_CONTEXT_TTL']
+)
+
+# In-memory retrieval index over QA.question, built on first use
+qa_index = QAIndex(threshold=app.config['QA_MATCH_THRESHOLD'])
+qa_index_lock = threading.Lock()
+
+def get_qa_index():
+    if not qa_index.loaded:
+        with qa_index_lock:
+            if not qa_index.loaded:
+                qa_index.build(db.session.query(QA.id, QA.question).all())
+                logging.info(f"Built QA index with {len(qa_index)} questions")
+    return qa_index
+
+# Vectorised paraphrase lookup in front of the Gemini call, loaded on first use
+semantic_cache = SemanticCache(
+    app.config['SEMANTIC_CACHE_PATH'],
+    threshold=app.config['SEMANTIC_CACHE_THRESHOLD'],
+    dim=app.config['SEMANTIC_CACHE_DIM']
+)
+semantic_cache_lock = threading.Lock()
+atexit.register(semantic_cache.save_if_due, force=True)
+
+# Bumped whenever a process adds, edits or deletes questions (admin pages,
+# Gemini auto-saves, `flask qa import`). Workers sharing a sqlite or redis
+# CACHE_BACKEND see the new value within QA_VERSION_CHECK_INTERVAL seconds and
+# reload their lookup indexes; with the memory backend it never leaves the
+# process that changed the table.
+qa_version = build_store(
+    'qa_version',
+    backend=app.config['CACHE_BACKEND'],
+    max_entries=16,
+    default_ttl=0,
+    sqlite_path=app.config['CACHE_SQLITE_PATH'],
+    redis_url=app.config['CACHE_REDIS_URL']
+)
+qa_version_seen = None
+qa_version_checked = 0.0
+qa_version_lock = threading.Lock()
+
+def bump_qa_version():
+    """Tell other workers the questions changed; this worker's indexes are already current"""
+    global qa_version_seen
+    version = uuid.uuid4().hex
+    try:
+        current = qa_version.get('qa')
+        qa_version.set('qa', version)
+    except Exception as e:
+        logging.error(f"QA version bump failed: {e}")
+        return
+    if current == qa_version_seen:
+        # Otherwise another worker's change is still to be loaded here
+        qa_version_seen = version
+
+def reload_if_qa_changed():
+    """Rebuild the lookup indexes if another process bumped the QA version"""
+    global qa_version_seen, qa_version_checked
+    if time.monotonic() - qa_version_checked < app.config['QA_VERSION_CHECK_INTERVAL']:
+        return
+    if not qa_version_lock.acquire(blocking=False):
+        return
+    try:
+        qa_version_checked = time.monotonic()
+        try:
+            version = qa_version.get('qa')
+        except Exception as e:
+            logging.error(f"QA version check failed: {e}")
+            return
+        previous, qa_version_seen = qa_version_seen, version
+        if version == previous or not (qa_index.loaded or semantic_cache.loaded):
+            # Indexes built from here on read the current rows anyway
+            return
+        rows = db.session.query(QA.id, QA.question).all()
+        if qa_index.loaded:
+            with qa_index_lock:
+                qa_index.build(rows)
+        if semantic_cache.loaded:
+            with semantic_cache_lock:
+                semantic_cache.load(rows)
+        # The importer invalidated the shared tier; drop this worker's copies
+        response_cache.local.clear()
+        logging.info(f"QA version changed, reloaded the lookup indexes with {len(rows)} questions")
+    finally:
+        qa_version_lock.release()
+
+# Conversations, feedback and times_asked counters are written in batches by a
+# background thread instead of committing on every request
+write_behind = WriteBehindQueue(
+    app,
+    max_size=app.config['WRITE_BEHIND_QUEUE_SIZE'],
+    flush_interval=app.config['WRITE_BEHIND_INTERVAL_MS'] / 1000,
+    batch_size=app.config['WRITE_BEHIND_BATCH_SIZE']
+)
+write_behind.add_flush_hook(apply_rollups)
+atexit.register(write_behind.stop)
+startup_marks.append(('caches', time.perf_counter()))
 
-# Simple cache for frequently asked questions
-qa_cache = {}
+rollups_cli = AppGroup('rollups', help='Maintain the analytics rollup tables.')
 
-def cache_response(func):
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        cache_key = f"{args}_{kwargs}"
-        if cache_key in qa_cache:
-            return qa_cache[cache_key]
-        result = func(*args, **kwargs)
-        qa_cache[cache_key] = result
-        return result
-    return wrapper
+@rollups_cli.command('rebuild')
+def rebuild_rollups_command():
+    """Recompute the hourly and daily rollups from the raw tables"""
+    start = time.time()
+    conversations, feedbacks = rebuild_rollups()
+    click.echo(f"Rebuilt rollups from {conversations} conversations and {feedbacks} feedback rows "
+               f"in {time.time() - start:.1f}s")
+
+app.cli.add_command(rollups_cli)
+
+language_cli = AppGroup('language', help='Maintain stored language tags.')
+
+@language_cli.command('retag')
+@click.option('--batch-size', default=1000, show_default=True, help='Conversations per transaction.')
+@click.option('--dry-run', is_flag=True, help='Count the changes without writing them.')
+def retag_conversations_command(batch_size, dry_run):
+    """Re-detect the language of stored conversations and refresh the rollups"""
+    start = time.time()
+    scanned, changed = retag_conversations(language_detector, batch_size=batch_size, dry_run=dry_run)
+    click.echo(f"{'Would retag' if dry_run else 'Retagged'} {changed} of {scanned} conversations "
+               f"in {time.time() - start:.1f}s")
+    if changed and not dry_run:
+        # The rollups count conversations per language
+        rebuild_rollups()
+        click.echo("Rebuilt rollups")
+
+app.cli.add_command(language_cli)
+
+qa_cli = AppGroup('qa', help='Bulk import and export the knowledge base.')
+
+@qa_cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(QA_FORMATS), help='Defaults to the file extension.')
+@click.option('--batch-size', default=5000, show_default=True, help='Questions per transaction.')
+@click.option('--keep-formatting', is_flag=True, help='Store answers as given instead of cleaning them.')
+def import_qas_command(path, fmt, batch_size, keep_formatting):
+    """Upsert question/answer pairs from a JSON, NDJSON or CSV file.
+
+    Running workers pick up the changes within QA_VERSION_CHECK_INTERVAL
+    seconds when they share a sqlite or redis CACHE_BACKEND. With the memory
+    backend they keep their old indexes and cached answers until restarted.
+    """
+    fmt = fmt or format_for(path)
+    if fmt is None:
+        raise click.UsageError('Cannot tell the format from the file name; pass --format')
+    start = time.time()
+    with open(path, encoding='utf-8', newline='') as stream:
+        try:
+            result = import_qas(read_records(stream, fmt), batch_size=batch_size, clean=not keep_formatting)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+    elapsed = time.time() - start
+    click.echo(f"Read {result.read} records in {elapsed:.1f}s ({result.read / max(elapsed, 1e-6):.0f} rows/s): "
+               f"{result.inserted} inserted, {result.updated} updated, {result.unchanged} unchanged, "
+               f"{result.skipped} skipped")
+    for error in result.errors:
+        click.echo(f"  {error}")
+
+    if not (result.inserted or result.updated):
+        return
+    # Lookup indexes are refreshed once for the whole load
+    start = time.time()
+    for qa_id in result.changed_ids:
+        response_cache.invalidate_tag(('qa', qa_id))
+    semantic_cache.load(db.session.query(QA.id, QA.question).all())
+    bump_qa_version()
+    click.echo(f"Refreshed the semantic cache snapshot in {time.time() - start:.1f}s")
+    if app.config['CACHE_BACKEND'] == 'memory':
+        click.echo("Restart running workers to load the new questions (CACHE_BACKEND=memory is not shared)")
+    else:
+        click.echo(f"Running workers reload within {app.config['QA_VERSION_CHECK_INTERVAL']:g}s")
+
+@qa_cli.command('export')
+@click.argument('path', type=click.Path(dir_okay=False, writable=True))
+@click.option('--format', 'fmt', type=click.Choice(QA_FORMATS), help='Defaults to the file extension.')
+def export_qas_command(path, fmt):
+    """Write every question/answer pair to a file that qa import reads back"""
+    fmt = fmt or format_for(path) or 'json'
+    start = time.time()
+    with open(path, 'w', encoding='utf-8', newline='') as stream:
+        count = export_qas(stream, fmt)
+    click.echo(f"Exported {count} questions to {path} in {time.time() - start:.1f}s")
+
+app.cli.add_command(qa_cli)
+
+def get_semantic_cache():
+    if not semantic_cache.loaded:
+        with semantic_cache_lock:
+            if not semantic_cache.loaded:
+                semantic_cache.load(db.session.query(QA.id, QA.question).all())
+    return semantic_cache
+
+def index_qa(qa):
+    """Add or refresh a committed QA in the lookup indexes"""
+    get_qa_index().add(qa.id, qa.question)
+    get_semantic_cache().add(qa.id, qa.question)
+
+def unindex_qa(qa_id):
+    get_qa_index().remove(qa_id)
+    get_semantic_cache().remove(qa_id)
+
+def find_matching_qa(user_input):
+    """Look up the stored QA closest to the user input, or None"""
+    source = 'qa_index'
+    with span('qa_index'):
+        qa_id = get_qa_index().best_match(user_input)
+    if qa_id is None:
+        # Another worker may have stored this exact question since our indexes
+        # were loaded; QA.question is unique, so this is one indexed read
+        with span('qa_fetch'):
+            qa = QA.query.filter_by(question=user_input).first()
+        if qa is not None:
+            index_qa(qa)
+            answer_lookups_total.inc(result='database')
+            return qa
+        # Fall back to paraphrase matching before paying for a Gemini call
+        source = 'semantic_cache'
+        with span('semantic_cache'):
+            qa_id = get_semantic_cache().best_match(user_input)
+    if qa_id is None:
+        return None
+    with span('qa_fetch'):
+        qa = QA.query.get(qa_id)
+    if qa is None:
+        # Deleted by another worker since the indexes were built
+        unindex_qa(qa_id)
+    else:
+        answer_lookups_total.inc(result=source)
+    return qa
 
 @login_manager.user_loader
 def load_user(user_id):
@@ -85,38 +499,227 @@ def submit_feedback():
         session_id = data.get('sessionId')
         metadata = data.get('metadata', {})
 
-        qa = QA.query.get(response_id)
+        with span('feedback_lookup'):
+            qa = QA.query.get(response_id)
         if not qa:
             return jsonify({'error': 'Invalid response ID'}), 400
 
-        # Create feedback record
-        feedback = ResponseFeedback(
-            qa_id=response_id,
-            is_positive=is_positive,
-            session_id=session_id,
-            metadata=metadata
-        )
-        db.session.add(feedback)
-
-        # Update QA feedback counts and score
-        qa.add_feedback(is_positive)
-        
-        db.session.commit()
+        # Feedback row, counts and score are written by the write-behind queue
+        with span('feedback_enqueue'):
+            write_behind.record_feedback(response_id, is_positive, session_id=session_id, metadata=metadata)
         return jsonify({'message': 'Feedback recorded successfully'}), 200
 
     except Exception as e:
         logging.error(f"Error recording feedback: {str(e)}")
         return jsonify({'error': 'Failed to record feedback'}), 500
 
+def translate_segments(texts, target_language):
+    """Translate a list of segments in one Google Translate request"""
+    try:
+        with span('translate_upstream'):
+            translations = translate_client.get().translate(texts, target_language=target_language)
+    except Exception:
+        upstream_errors_total.inc(upstream='translate')
+        raise
+    return [translation['translatedText'] for translation in translations]
+
+# Translation memory (SQLite table + in-memory LRU) in front of Google Translate
+translation_cache = TranslationCache(translate_segments, max_entries=app.config['TRANSLATION_MEMORY_SIZE'])
+translation_prewarm_started = False
+
+def get_translation_cache():
+    global translation_prewarm_started
+    if not translation_prewarm_started:
+        translation_prewarm_started = True
+        translation_cache.prewarm_in_background(
+            app, [FOLLOW_UP_PROMPT, ERROR_RESPONSE], app.config['TRANSLATION_PREWARM_LANGUAGES'])
+    return translation_cache
+
 # Function to translate text
 def translate_text(text, target_language="en"):
     try:
-        translation = translate_client.translate(text, target_language=target_language)
-        return translation['translatedText']
+        return get_translation_cache().translate(text, target_language)
     except Exception as e:
         logging.error(f"Translation error: {e}")
         return f"Translation error: {str(e)}"
 
+def try_translate_texts(texts, target_language):
+    """Translate several segments with at most one upstream round trip.
+
+    Returns (translations, True), or (the texts unchanged, False) if Translate
+    failed. The fallback may be shown to the user but must never be stored or
+    cached as a translation.
+    """
+    try:
+        return get_translation_cache().translate_batch(texts, target_language), True
+    except Exception as e:
+        logging.error(f"Translation error: {e}")
+        return list(texts), False
+
+def translate_texts(texts, target_language):
+    """``try_translate_texts`` for text that is only displayed, such as error messages"""
+    return try_translate_texts(texts, target_language)[0]
+
+def lookup_answer(user_input):
+    """Answer cache first, then exact or close match from the question indexes.
+
+    Returns the cache key and the cached {'qa_id', 'answer'[, 'lang']} dict, or None.
+    """
+    reload_if_qa_changed()
+    cache_key = make_key('answer', user_input)
+    with span('response_cache'):
+        cached = response_cache.get(cache_key)
+    if cached is not None:
+        answer_lookups_total.inc(result='response_cache')
+    else:
+        existing_qa = find_matching_qa(user_input)
+        if existing_qa:
+            cached = {'qa_id': existing_qa.id, 'answer': existing_qa.answer}
+            response_cache.set(cache_key, cached, tags=[('qa', existing_qa.id)])
+    return cache_key, cached
+
+def find_answer_variant(qa_id, user_lang):
+    with span('variant_lookup'):
+        return QATranslation.query.filter_by(qa_id=qa_id, lang=user_lang).first()
+
+def remember_answer_variant(variant, qa_id, user_lang, user_input, answer):
+    if not variant or variant.question != user_input:
+        # Remember this phrasing so the next identical question is one indexed read
+        db.session.add(QATranslation(qa_id=qa_id, lang=user_lang, question=user_input, answer=answer))
+        try:
+            with span('commit'):
+                db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logging.debug(f"Answer variant already stored: {e}")
+
+def get_answer_variant(qa_id, english_answer, user_lang, user_input):
+    """The stored answer in ``user_lang``, translating and saving it on first use.
+
+    Returns (answer, translated); when Translate fails the English answer comes
+    back with False and nothing is saved.
+    """
+    variant = find_answer_variant(qa_id, user_lang)
+    if variant:
+        answer, translated = variant.answer, True
+    else:
+        with span('translate_out'):
+            (answer,), translated = try_translate_texts([english_answer], user_lang)
+    if translated:
+        remember_answer_variant(variant, qa_id, user_lang, user_input, answer)
+    return answer, translated
+
+def lookup_question_variant(user_input, user_lang, cache_key):
+    """The answer to this exact question as previously asked in ``user_lang``, or None"""
+    with span('variant_lookup'):
+        variant = QATranslation.query.filter_by(lang=user_lang, question=user_input).first()
+    if not variant:
+        return None
+    answer_lookups_total.inc(result='translation_variant')
+    cached = {'qa_id': variant.qa_id, 'answer': variant.answer, 'lang': user_lang}
+    response_cache.set(cache_key, cached, tags=[('qa', variant.qa_id)])
+    return cached
+
+def lookup_english_answer(translated_input):
+    """The stored English answer for the translated question, or None"""
+    logging.debug(f"Translated input: {translated_input}")
+    _, english = lookup_answer(translated_input)
+    if not english or english.get('lang', 'en') != 'en':
+        return None
+    return english
+
+def cache_translated_answer(cache_key, english, answer, user_lang, translated=True):
+    if not translated:
+        # Serve the English answer as what it is, and ask Translate again next time
+        return {'qa_id': english['qa_id'], 'answer': answer, 'lang': 'en'}
+    cached = {'qa_id': english['qa_id'], 'answer': answer, 'lang': user_lang}
+    response_cache.set(cache_key, cached, tags=[('qa', english['qa_id'])])
+    return cached
+
+def lookup_translated_answer(user_input, user_lang, cache_key):
+    """Find a stored answer for a non-English question.
+
+    Tries the question as previously asked in this language, then its English
+    translation against the English knowledge base. Returns the cached payload
+    (or None) and the English form of the question, which is None if Translate
+    failed.
+    """
+    cached = lookup_question_variant(user_input, user_lang, cache_key)
+    if cached:
+        return cached, None
+
+    with span('translate_in'):
+        (translated_input,), translated = try_translate_texts([user_input], "en")
+    if not translated:
+        return None, None
+    translated_input = translated_input.strip().lower()
+    english = lookup_english_answer(translated_input)
+    if not english:
+        return None, translated_input
+
+    answer, translated = get_answer_variant(english['qa_id'], english['answer'], user_lang, user_input)
+    return cache_translated_answer(cache_key, english, answer, user_lang, translated), translated_input
+
+async def lookup_translated_answer_async(user_input, user_lang, cache_key):
+    """``lookup_translated_answer`` with the translations awaited through ``call_upstream``
+
+    Index and database reads stay on the request's own thread.
+    """
+    cached = lookup_question_variant(user_input, user_lang, cache_key)
+    if cached:
+        return cached, None
+
+    with span('translate_in'):
+        (translated_input,), translated = await try_translate_texts_async([user_input], "en")
+    if not translated:
+        return None, None
+    translated_input = translated_input.strip().lower()
+    english = lookup_english_answer(translated_input)
+    if not english:
+        return None, translated_input
+
+    variant = find_answer_variant(english['qa_id'], user_lang)
+    if variant:
+        answer, translated = variant.answer, True
+    else:
+        with span('translate_out'):
+            (answer,), translated = await try_translate_texts_async([english['answer']], user_lang)
+    if translated:
+        remember_answer_variant(variant, english['qa_id'], user_lang, user_input, answer)
+    return cache_translated_answer(cache_key, english, answer, user_lang, translated), translated_input
+
+def resolve_answer(user_input):
+    """Find a stored answer for the input in any language.
+
+    Returns (cache_key, cached payload or None, user language, English input);
+    the English input is None if the question could not be translated.
+    """
+    cache_key, cached = lookup_answer(user_input)
+    if cached:
+        return cache_key, cached, cached.get('lang', 'en'), user_input
+    user_lang = detect_user_language(user_input)
+    if user_lang == 'en':
+        answer_lookups_total.inc(result='miss')
+        return cache_key, None, user_lang, user_input
+    cached, translated_input = lookup_translated_answer(user_input, user_lang, cache_key)
+    if not cached:
+        answer_lookups_total.inc(result='miss')
+    return cache_key, cached, user_lang, translated_input
+
+async def resolve_answer_async(user_input):
+    """``resolve_answer`` for the async endpoint; only the translations leave the event loop"""
+    cache_key, cached = lookup_answer(user_input)
+    if cached:
+        return cache_key, cached, cached.get('lang', 'en'), user_input
+    user_lang = detect_user_language(user_input)
+    if user_lang == 'en':
+        answer_lookups_total.inc(result='miss')
+        return cache_key, None, user_lang, user_input
+    cached, translated_input = await lookup_translated_answer_async(user_input, user_lang, cache_key)
+    if not cached:
+        answer_lookups_total.inc(result='miss')
+    return cache_key, cached, user_lang, translated_input
+
 @app.route('/get_response', methods=['POST'])
 def get_response():
     start_time = time.time()
@@ -124,189 +727,317 @@ def get_response():
     user_input = request.form.get('message', '').strip().lower()
     session_id = request.form.get('session_id', generate_session_id())
     
-    # First, check for exact match
-    existing_qa = QA.query.filter_by(question=user_input).first()
+    cache_key, cached, user_lang, translated_input = resolve_answer(user_input)
+
+    if cached:
+        return jsonify(record_cached_answer(cached, user_input, session_id, start_time))
+
+    # Only one worker asks Gemini about the same question at a time; the rest
+    # wait for its answer to land in the cache
+    lease = response_cache.acquire(cache_key)
+    if lease is None:
+        cached = response_cache.get(cache_key)
+        if cached:
+            return jsonify(record_cached_answer(cached, user_input, session_id, start_time))
+    try:
+        return answer_with_gemini(user_input, translated_input, user_lang, session_id, start_time)
+    finally:
+        response_cache.release(cache_key, lease)
+
+def record_cached_answer(cached, user_input, session_id, start_time):
+    """Record a conversation answered from the cache or database; returns the response payload"""
+    logging.info(f"Found answer in database for: {user_input}")
+    answers_total.inc(source='database')
+    lang = cached.get('lang', 'en')
+    write_behind.record_asked(cached['qa_id'])
     
-    # If no exact match, try similar questions using SQL LIKE
-    if not existing_qa:
-        similar_questions = QA.query.filter(
-            QA.question.like(f"%{user_input}%")
-        ).first()
-        if similar_questions:
-            existing_qa = similar_questions
-
-    if existing_qa:
-        logging.info(f"Found answer in database for: {user_input}")
-        existing_qa.increment_asked()
-        
-        # Track conversation
-        response_time = time.time() - start_time
-        conversation = Conversation(
-            session_id=session_id,
-            user_message=user_input,
-            bot_response=existing_qa.answer,
-            response_time=response_time
-        )
-        db.session.add(conversation)
-        db.session.commit()
-        
-        return jsonify({
-            'answer': existing_qa.answer,
-            'responseId': existing_qa.id,
-            'responseLang': 'en',
-            'sessionId': session_id
-        })
+    # Track conversation
+    response_time = time.time() - start_time
+    write_behind.record_conversation(session_id, user_input, cached['answer'], lang, response_time)
+    session_context.append(session_id, user_input, cached['answer'])
     
-    # If no match found in database, proceed with language detection and Gemini
+    return {
+        'answer': cached['answer'],
+        'responseId': cached['qa_id'],
+        'responseLang': lang,
+        'sessionId': session_id
+    }
+
+GEMINI_MODEL_NAME = "gemini-2.0-flash-exp"
+GENERATION_CONFIG = {
+    "temperature": 0.7,
+    "top_p": 0.9,
+    "top_k": 40,
+    "max_output_tokens": 500,
+}
+FOLLOW_UP_PROMPT = "Is there anything specific you'd like me to clarify?"
+ERROR_RESPONSE = """Hi! I apologize, but I'm having trouble right now.
+
+- Please try asking your question again
+- Make sure your question is about Canvas LMS
+- Try rephrasing your question
+- Break down complex questions into simpler ones
+
+Helpful Resources:
+- Canvas Student Guide (https://community.canvaslms.com/t5/Canvas-Student-Guide/tkb-p/student)
+- UMB Canvas Support (https://www.umb.edu/canvas/)
+- Canvas Video Tutorials (https://community.canvaslms.com/t5/Video-Guide/tkb-p/videos)"""
+
+def detect_user_language(user_input):
     try:
-        user_lang, _ = detect_language(user_input)
+        with span('detect_language'):
+            user_lang = detect_language(user_input)
         logging.debug(f"Detected user language: {user_lang}")
     except Exception as e:
         logging.error(f"Language detection error: {e}")
         user_lang = 'en'
+    return user_lang
+
+def load_context_messages(session_id):
+    """Last few turns of this session, oldest first, within the prompt's context budget"""
+    with span('context'):
+        return session_context.context_messages(session_id, app.config['CONTEXT_MAX_TOKENS'])
+
+def prompt_for(translated_input, session_id):
+    """The per-request part of the prompt; the instructions are the model's system instruction"""
+    return build_prompt(translated_input, load_context_messages(session_id), app.config['QUESTION_MAX_TOKENS'])
+
+# Gemini models are built once per process and shared; calls are bounded,
+# carry a deadline and fail fast while the circuit breaker is open
+gemini_pool = GeminiPool(
+    lambda **kwargs: gemini_sdk.get().GenerativeModel(system_instruction=SYSTEM_INSTRUCTION, **kwargs),
+    GEMINI_MODEL_NAME,
+    GENERATION_CONFIG,
+    max_concurrency=app.config['GEMINI_MAX_CONCURRENCY'],
+    timeout=app.config['GEMINI_TIMEOUT'],
+    breaker=CircuitBreaker(
+        failure_threshold=app.config['GEMINI_BREAKER_THRESHOLD'],
+        reset_timeout=app.config['GEMINI_BREAKER_RESET']
+    )
+)
+
+def record_token_usage(usage):
+    if usage['prompt_tokens']:
+        gemini_tokens_total.inc(usage['prompt_tokens'], kind='prompt')
+    if usage['completion_tokens']:
+        gemini_tokens_total.inc(usage['completion_tokens'], kind='completion')
+    return usage
+
+def generate_answer(prompt):
+    """The cleaned answer text and its token usage"""
+    try:
+        with span('gemini'):
+            response = gemini_pool.generate(prompt)
+    except Exception:
+        upstream_errors_total.inc(upstream='gemini')
+        raise
+    return clean_answer(response.text), record_token_usage(token_usage(response))
+
+def stream_answer(prompt, usage):
+    """Yield the answer text as Gemini generates it; ``usage`` is filled in at the end"""
+    start = time.perf_counter()
+    last = None
+    try:
+        for chunk in gemini_pool.stream(prompt):
+            if last is None:
+                stage_seconds.observe(time.perf_counter() - start, stage='gemini_first_chunk')
+            last = chunk
+            if chunk.text:
+                yield chunk.text
+    except Exception:
+        upstream_errors_total.inc(upstream='gemini')
+        raise
+    stage_seconds.observe(time.perf_counter() - start, stage='gemini_stream')
+    # Every chunk carries the usage so far; the last one has the totals
+    usage.update(record_token_usage(token_usage(last)))
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/get_response_stream', methods=['POST'])
+def get_response_stream():
+    """Server-Sent Events variant of /get_response.
+
+    Emits ``chunk`` events with formatted answer text as it is generated and a
+    final ``done`` event carrying the same payload /get_response returns.
+    """
+    start_time = time.time()
     
-    # Get conversation context
-    recent_context = Conversation.query.filter_by(session_id=session_id).order_by(Conversation.created_at.desc()).limit(3).all()
-    context_messages = []
-    for conv in reversed(recent_context):
-        context_messages.append(f"User: {conv.user_message}")
-        context_messages.append(f"Bot: {conv.bot_response}")
-    
-    # Translate the input to English for processing
-    if user_lang != 'en':
+    user_input = request.form.get('message', '').strip().lower()
+    session_id = request.form.get('session_id', generate_session_id())
+    cache_key, cached, user_lang, translated_input = resolve_answer(user_input)
+
+    @stream_with_context
+    def events():
+        nonlocal cached
+        if cached:
+            yield sse_event('done', record_cached_answer(cached, user_input, session_id, start_time))
+            return
+
+        lease = response_cache.acquire(cache_key)
         try:
-            translated_input = translate_text(user_input, target_language="en")
-            logging.debug(f"Translated input: {translated_input}")
-        except Exception as e:
-            logging.error(f"Translation error: {e}")
-            translated_input = user_input
-    else:
-        translated_input = user_input
-    
-    # Process the translated input
-    try:
-        generation_config = {
-            "temperature": 0.7,
-            "top_p": 0.9,
-            "top_k": 40,
-            "max_output_tokens": 500,
-        }
+            if lease is None:
+                cached = response_cache.get(cache_key)
+                if cached:
+                    yield sse_event('done', record_cached_answer(cached, user_input, session_id, start_time))
+                    return
+            yield from stream_gemini_events(user_input, translated_input, user_lang, session_id, start_time)
+        finally:
+            response_cache.release(cache_key, lease)
 
-        model = genai.GenerativeModel(
-            model_name="gemini-2.0-flash-exp",
-            generation_config=generation_config,
-        )
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
 
-        chat_session = model.start_chat()
+def stream_gemini_events(user_input, translated_input, user_lang, session_id, start_time):
+    prompt = prompt_for(translated_input or user_input, session_id)
+    usage = {'prompt_tokens': None, 'completion_tokens': None}
 
-        # Build context-aware prompt
-        context_text = "\n".join(context_messages) if context_messages else "No previous context"
-        
-        prompt = f""" As a Canvas LMS expert, provide a helpful response to this question about Canvas. 
-
-Previous conversation context:
-{context_text}
-
-Your response must: 
-1. Start with "Hi!" or a similar greeting on the first line 
-2. Follow with a brief introduction sentence 
-3. Use ONLY dash/hyphen (-) for bullet points (not *, • or **) 
-4. Put each bullet point on a new line 
-5. Replace any ** with bullet points using - 
-6. Only answer questions about Canvas LMS 
-7. If including links, format them as follows:    
- -Start a new section with "Helpful Resources:"    
- -Each resource on a new line starting with "-"    
- -Put the link description first, no Parentheses
- -include Helpful Resources links with every answer   
-Helpful Resources:    
- -Official Canvas Student Guide https://www.umb.edu/it/training-classroom-support/canvas-resources-for-students    
- -UMB Canvas Support Page https://cases.canvaslms.com/liveagentchat?chattype=student&sfid=A5WgTEKARcWFY5IXRv5FT8ePIss19I2qCvHxwOtD 
- -include these links with every answer
- Question: {translated_input} """
-
-        response = chat_session.send_message(prompt)
-        answer = response.text.strip()
-        
-        # Translate the response back to the user's language
+    try:
+        if user_lang == 'en':
+            formatter = StreamingFormatter()
+            parts = []
+            for text in stream_answer(prompt, usage):
+                formatted = formatter.feed(text)
+                if formatted:
+                    parts.append(formatted)
+                    yield sse_event('chunk', {'text': formatted})
+            tail = formatter.flush()
+            if tail:
+                parts.append(tail)
+                yield sse_event('chunk', {'text': tail})
+            english_answer = answer = ''.join(parts)
+            follow_up_prompt = FOLLOW_UP_PROMPT
+            translated = True
+        else:
+            # Partial sentences translate badly, so non-English answers are
+            # translated once complete and sent as a single chunk
+            english_answer, usage = generate_answer(prompt)
+            with span('translate_out'):
+                (answer, follow_up_prompt), translated = try_translate_texts(
+                    [english_answer, FOLLOW_UP_PROMPT], user_lang)
+            answer = clean_answer(answer)
+            yield sse_event('chunk', {'text': append_follow_up(answer, follow_up_prompt)})
+
+        # Persist only once the whole answer has been generated
+        qa_id = save_generated_answer(
+            user_input, translated_input, english_answer, answer, user_lang, session_id, start_time, usage,
+            translated)
+        yield sse_event('done', {
+            'answer': append_follow_up(answer, follow_up_prompt),
+            'responseId': qa_id,
+            'responseLang': user_lang if translated else 'en',
+            'sessionId': session_id
+        })
+
+    except Exception as e:
+        logging.error(f"Error: {str(e)}")
+        answers_total.inc(source='error')
+        error_response = ERROR_RESPONSE
         if user_lang != 'en':
-            try:
-                answer = translate_text(answer, target_language=user_lang)
-                logging.debug(f"Translated response: {answer}")
-            except Exception as e:
-                logging.error(f"Translation error: {e}")
-        
-        # Save the response to the database
+            error_response = translate_texts([error_response], user_lang)[0]
+        yield sse_event('done', {
+            'answer': error_response,
+            'responseId': None,
+            'responseLang': user_lang,
+            'sessionId': session_id
+        })
+
+def store_generated_qa(question, english_answer):
+    """The QA for an English question, inserting the generated answer if it is new"""
+    # Another worker, or another phrasing, may already have stored this question
+    new_qa = QA.query.filter_by(question=question).first()
+    if new_qa is None:
         new_qa = QA(
-            question=user_input,
-            answer=answer
+            question=question,
+            answer=english_answer
         )
         db.session.add(new_qa)
+        # The new QA is committed now because its id goes back to the client
+        try:
+            with span('commit'):
+                db.session.commit()
+        except IntegrityError:
+            # Stored by another worker between the lookup and the commit
+            db.session.rollback()
+            new_qa = QA.query.filter_by(question=question).one()
+        else:
+            bump_qa_version()
+    with span('index'):
+        index_qa(new_qa)
+    response_cache.set(
+        make_key('answer', new_qa.question),
+        {'qa_id': new_qa.id, 'answer': new_qa.answer},
+        tags=[('qa', new_qa.id)]
+    )
+    return new_qa
+
+def save_generated_answer(user_input, translated_input, english_answer, answer, user_lang, session_id, start_time,
+                          usage=None, translated=True):
+    """Persist a Gemini answer and its conversation, and make it findable.
+
+    The knowledge base is kept in English; a non-English question is stored as
+    its English translation plus a QATranslation variant in the user's language.
+    Untranslated fallbacks are never stored: no QA when the question could not
+    be translated (``translated_input`` is None), and no variant when the
+    answer could not be (``translated`` is False). Returns the QA id or None.
+    """
+    qa_id = None
+    if translated_input is not None:
+        qa_id = store_generated_qa(translated_input, english_answer).id
+        if user_lang != 'en' and translated:
+            remember_answer_variant(None, qa_id, user_lang, user_input, answer)
+            response_cache.set(
+                make_key('answer', user_input),
+                {'qa_id': qa_id, 'answer': answer, 'lang': user_lang},
+                tags=[('qa', qa_id)]
+            )
+    answers_total.inc(source='gemini')
+    response_time = time.time() - start_time
+    write_behind.record_conversation(session_id, user_input, answer, user_lang, response_time, **(usage or {}))
+    session_context.append(session_id, user_input, answer)
+    return qa_id
+
+def answer_with_gemini(user_input, translated_input, user_lang, session_id, start_time):
+    """No match found in the database: ask Gemini with the English form of the question"""
+    # Process the translated input
+    try:
+        # An untranslatable question goes to Gemini as asked
+        english_answer, usage = generate_answer(prompt_for(translated_input or user_input, session_id))
+        answer = english_answer
         
-        # Track conversation
-        response_time = time.time() - start_time
-        conversation = Conversation(
-            session_id=session_id,
-            user_message=user_input,
-            bot_response=answer,
-            user_language=user_lang,
-            response_time=response_time
-        )
-        db.session.add(conversation)
-        db.session.commit()
-        
-        # Format the answer with bullet points
-        answer = answer.replace('**', '')
-        lines = answer.split('\n')
-        formatted_lines = []
-        for line in lines:
-            line = line.strip()
-            if line.startswith('*'):
-                line = '- ' + line[1:].strip()
-            formatted_lines.append(line)
-        
-        answer = '\n'.join(formatted_lines)
-        
-        # Add follow-up prompt if not present (translate it to the user's language)
-        follow_up_prompt = "Is there anything specific you'd like me to clarify?"
+        # Translate the response and the follow-up prompt back to the user's
+        # language in one round trip (the follow-up is normally prewarmed)
+        follow_up_prompt = FOLLOW_UP_PROMPT
+        translated = True
         if user_lang != 'en':
-            try:
-                follow_up_prompt = translate_text(follow_up_prompt, target_language=user_lang)
-            except Exception as e:
-                logging.error(f"Translation error: {e}")
-        answer += f"\n\n- {follow_up_prompt}"
-
-        # Detect the language of the final response
-        response_lang, _ = detect_language(answer)
-        logging.debug(f"Detected response language: {response_lang}")
+            with span('translate_out'):
+                (answer, follow_up_prompt), translated = try_translate_texts([answer, follow_up_prompt], user_lang)
+            answer = clean_answer(answer)
+            logging.debug(f"Translated response: {answer}")
+        
+        # Save the already formatted response, so database hits need no
+        # further processing
+        qa_id = save_generated_answer(
+            user_input, translated_input, english_answer, answer, user_lang, session_id, start_time, usage,
+            translated)
 
         return jsonify({
-            'answer': answer,
-            'responseId': new_qa.id,
-            'responseLang': response_lang,  # Return the detected language
+            'answer': append_follow_up(answer, follow_up_prompt),
+            'responseId': qa_id,
+            'responseLang': user_lang if translated else 'en',  # The language the answer is in
             'sessionId': session_id
         })
 
     except Exception as e:
         logging.error(f"Error: {str(e)}")
-        error_response = """Hi! I apologize, but I'm having trouble right now.
-
-- Please try asking your question again
-- Make sure your question is about Canvas LMS
-- Try rephrasing your question
-- Break down complex questions into simpler ones
-
-Helpful Resources:
-- Canvas Student Guide (https://community.canvaslms.com/t5/Canvas-Student-Guide/tkb-p/student)
-- UMB Canvas Support (https://www.umb.edu/canvas/)
-- Canvas Video Tutorials (https://community.canvaslms.com/t5/Video-Guide/tkb-p/videos)"""
+        answers_total.inc(source='error')
+        error_response = ERROR_RESPONSE
         
         # Translate the error response to the user's language
         if user_lang != 'en':
-            try:
-                error_response = translate_text(error_response, target_language=user_lang)
-            except Exception as e:
-                logging.error(f"Translation error: {e}")
+            error_response = translate_texts([error_response], user_lang)[0]
         
         return jsonify({
             'answer': error_response,
@@ -315,8 +1046,101 @@ Helpful Resources:
             'sessionId': session_id
         })
 
+# Upstream calls from the async endpoint run in worker threads; this bounds how
+# many are in flight per process regardless of how many requests are waiting
+upstream_slots = threading.BoundedSemaphore(app.config['UPSTREAM_MAX_CONCURRENCY'])
+
+def _call_with_slot(func, *args, **kwargs):
+    with upstream_slots:
+        return func(*args, **kwargs)
+
+async def call_upstream(func, *args, **kwargs):
+    """Run a blocking upstream call off the event loop with a deadline"""
+    return await asyncio.wait_for(
+        asyncio.to_thread(_call_with_slot, func, *args, **kwargs),
+        timeout=app.config['UPSTREAM_TIMEOUT']
+    )
+
+async def try_translate_texts_async(texts, target_language):
+    """``try_translate_texts`` through ``call_upstream``; a timeout counts as a failure"""
+    try:
+        return await call_upstream(try_translate_texts, texts, target_language)
+    except asyncio.TimeoutError:
+        logging.error(f"Translation timed out after {app.config['UPSTREAM_TIMEOUT']}s")
+        return list(texts), False
+
+async def translate_texts_async(texts, target_language):
+    return (await try_translate_texts_async(texts, target_language))[0]
+
+@app.route('/get_response_async', methods=['POST'])
+async def get_response_async():
+    """Same contract as /get_response, but upstream calls are awaited concurrently"""
+    start_time = time.time()
+    
+    user_input = request.form.get('message', '').strip().lower()
+    session_id = request.form.get('session_id', generate_session_id())
+    
+    # Index, cache and SQLite lookups run inline (Flask gives this request its
+    # own event loop); translating a non-English question goes through
+    # call_upstream, with its deadline and concurrency limit
+    cache_key, cached, user_lang, translated_input = await resolve_answer_async(user_input)
+
+    if cached:
+        return jsonify(record_cached_answer(cached, user_input, session_id, start_time))
+
+    lease = await asyncio.to_thread(response_cache.acquire, cache_key)
+    if lease is None:
+        cached = response_cache.get(cache_key)
+        if cached:
+            return jsonify(record_cached_answer(cached, user_input, session_id, start_time))
+    try:
+        return await answer_with_gemini_async(user_input, translated_input, user_lang, session_id, start_time)
+    finally:
+        response_cache.release(cache_key, lease)
+
+async def answer_with_gemini_async(user_input, translated_input, user_lang, session_id, start_time):
+    try:
+        generation = call_upstream(generate_answer, prompt_for(translated_input or user_input, session_id))
+        follow_up_prompt = FOLLOW_UP_PROMPT
+        translated = True
+        if user_lang == 'en':
+            english_answer, usage = await generation
+            answer = english_answer
+        else:
+            # The follow-up does not depend on the answer, so it is translated
+            # while Gemini is still generating
+            (english_answer, usage), (follow_up_prompt,) = await asyncio.gather(
+                generation, translate_texts_async([follow_up_prompt], user_lang))
+            with span('translate_out'):
+                (answer,), translated = await try_translate_texts_async([english_answer], user_lang)
+            answer = clean_answer(answer)
+
+        qa_id = save_generated_answer(
+            user_input, translated_input, english_answer, answer, user_lang, session_id, start_time, usage,
+            translated)
+
+        return jsonify({
+            'answer': append_follow_up(answer, follow_up_prompt),
+            'responseId': qa_id,
+            'responseLang': user_lang if translated else 'en',
+            'sessionId': session_id
+        })
+
+    except Exception as e:
+        logging.error(f"Error: {e!r}")
+        answers_total.inc(source='error')
+        error_response = ERROR_RESPONSE
+        if user_lang != 'en':
+            error_response = (await translate_texts_async([error_response], user_lang))[0]
+        
+        return jsonify({
+            'answer': error_response,
+            'responseId': None,
+            'responseLang': user_lang,
+            'sessionId': session_id
+        })
+
 def generate_session_id():
-    import random
     import string
     return ''.join(random.choices(string.ascii_letters + string.digits, k=10))
 
@@ -335,8 +1159,29 @@ def admin_login():
 @app.route('/admin/dashboard')
 @login_required
 def admin_dashboard():
-    qas = QA.query.all()
-    return render_template('admin/dashboard.html', qas=qas)
+    # Rows are fetched page by page from /admin/api/qa
+    return render_template('admin/dashboard.html')
+
+@app.route('/admin/api/qa')
+@login_required
+def admin_api_qa():
+    """Keyset-paginated, sortable and searchable QA listing for the admin pages"""
+    search = request.args.get('q', '').strip()
+    sort = request.args.get('sort', 'relevance' if search else 'id')
+    direction = request.args.get('direction', 'desc')
+    if direction not in ('asc', 'desc'):
+        return jsonify({'error': 'direction must be asc or desc'}), 400
+    try:
+        items, next_cursor = list_qas(
+            sort=sort,
+            direction=direction,
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', 50, type=int),
+            search=search
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'items': items, 'next_cursor': next_cursor, 'sort': sort, 'direction': direction})
 
 @app.route('/admin/add', methods=['GET', 'POST'])
 @login_required
@@ -346,6 +1191,8 @@ def add_qa():
         qa = QA(question=form.question.data.lower(), answer=form.answer.data)
         db.session.add(qa)
         db.session.commit()
+        index_qa(qa)
+        bump_qa_version()
         flash('Q&A added successfully', 'success')
         return redirect(url_for('admin_dashboard'))
     return render_template('admin/add_qa.html', form=form)
@@ -360,7 +1207,12 @@ def edit_qa(qa_id):
         try:
             qa.question = form.question.data.lower().strip()
             qa.answer = form.answer.data.strip()
+            # Translated variants were made from the old answer
+            QATranslation.query.filter_by(qa_id=qa.id).delete()
             db.session.commit()
+            index_qa(qa)
+            bump_qa_version()
+            response_cache.invalidate_tag(('qa', qa.id))
             flash('Q&A updated successfully', 'success')
             return redirect(url_for('admin_dashboard'))
         except Exception as e:
@@ -381,23 +1233,26 @@ def delete_qa(qa_id):
     qa = QA.query.get_or_404(qa_id)
     db.session.delete(qa)
     db.session.commit()
+    unindex_qa(qa_id)
+    bump_qa_version()
+    response_cache.invalidate_tag(('qa', qa_id))
     flash('Q&A deleted successfully', 'success')
     return redirect(url_for('admin_dashboard'))
 
 @app.route('/admin/feedback_stats')
 @login_required
 def feedback_stats():
-    qas = QA.query.order_by(QA.priority_score.desc()).all()
-    return render_template('admin/feedback_stats.html', qas=qas)
+    return render_template('admin/feedback_stats.html')
 
 @app.route('/admin/analytics')
 @login_required
 def analytics():
-    # Get basic statistics
-    total_conversations = Conversation.query.count()
-    total_feedback = ResponseFeedback.query.count()
-    positive_feedback = ResponseFeedback.query.filter_by(is_positive=True).count()
-    negative_feedback = ResponseFeedback.query.filter_by(is_positive=False).count()
+    # Get basic statistics from the daily rollups
+    totals = summarize(load_rollups('day'))
+    total_conversations = totals['requests']
+    positive_feedback = totals['positive_feedback']
+    negative_feedback = totals['negative_feedback']
+    total_feedback = positive_feedback + negative_feedback
     
     # Get recent conversations
     recent_conversations = Conversation.query.order_by(Conversation.created_at.desc()).limit(10).all()
@@ -417,78 +1272,189 @@ def analytics():
     
     return render_template('admin/analytics.html', analytics=analytics_data)
 
+@app.route('/admin/profiles')
+@login_required
+def admin_profiles():
+    return render_template(
+        'admin/profiles.html',
+        profiles=profiler.summary(),
+        recent=list(profiler.recent),
+        sample_rate=app.config['PROFILE_SAMPLE_RATE'],
+        interval_ms=app.config['PROFILE_INTERVAL_MS']
+    )
+
+@app.route('/admin/profiles/settings', methods=['POST'])
+@login_required
+def profile_settings():
+    try:
+        sample_rate = float(request.form.get('sample_rate', 0))
+    except ValueError:
+        sample_rate = -1
+    if not 0 <= sample_rate <= 1:
+        flash('Sample rate must be between 0 and 1', 'error')
+    else:
+        app.config['PROFILE_SAMPLE_RATE'] = sample_rate
+        flash(f'Profiling {sample_rate:.1%} of requests in this worker', 'success')
+    return redirect(url_for('admin_profiles'))
+
+@app.route('/admin/profiles/reset', methods=['POST'])
+@login_required
+def reset_profiles():
+    profiler.reset()
+    flash('Profiles cleared', 'success')
+    return redirect(url_for('admin_profiles'))
+
+@app.route('/admin/profiles/download')
+@login_required
+def download_profile():
+    """Folded stacks for one endpoint (``?view=``), or all of them"""
+    view = request.args.get('view')
+    folded = profiler.collapsed(view)
+    if folded is None:
+        return jsonify({'error': 'No profile for this endpoint'}), 404
+    filename = f"profile_{view or 'all'}_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.folded"
+    return Response(folded, mimetype='text/plain', headers={'Content-Disposition': f'attachment; filename={filename}'})
+
 @app.route('/admin/logout')
 @login_required
 def admin_logout():
     logout_user()
     return redirect(url_for('index'))
 
-@app.route('/text_to_speech', methods=['POST'])
+# Speech backends in order of preference, e.g. SPEECH_BACKENDS=espeak,gtts
+speech_service = build_speech_service(
+    app.config['SPEECH_BACKENDS'],
+    espeak_path=app.config['ESPEAK_PATH'],
+    espeak_speed=app.config['ESPEAK_SPEED']
+)
+
+# Synthesized answers on local disk, keyed by (backend, lang, text)
+audio_cache = AudioCache(app.config['TTS_CACHE_DIR'], max_bytes=app.config['TTS_CACHE_MAX_BYTES'])
+tts_pregenerate_started = False
+
+def pregenerate_audio(limit):
+    """Synthesize the most-asked answers ahead of time"""
+    backend = speech_service.backend_for('en')
+    if backend is None:
+        return
+    top_qas = QA.query.order_by(QA.times_asked.desc()).limit(limit).all()
+    generated = 0
+    for qa in top_qas:
+        key = audio_key(qa.answer, 'en', backend.name)
+        if audio_cache.get(key, backend.extension):
+            continue
+        try:
+            audio_cache.store(key, speech_service.synthesize(backend, qa.answer, 'en'), backend.extension)
+            generated += 1
+        except Exception as e:
+            logging.error(f"Audio pre-generation failed for QA {qa.id}: {e}")
+            break
+    logging.info(f"Pre-generated audio for {generated} answers")
+
+def start_audio_pregeneration():
+    global tts_pregenerate_started
+    if tts_pregenerate_started or not app.config['TTS_PREGENERATE_TOP']:
+        return
+    tts_pregenerate_started = True
+
+    def run():
+        with app.app_context():
+            pregenerate_audio(app.config['TTS_PREGENERATE_TOP'])
+    threading.Thread(target=run, name='tts-pregenerate', daemon=True).start()
+
+@app.route('/text_to_speech', methods=['GET', 'POST'])
 def text_to_speech():
-    data = request.get_json()
+    # GET lets the client point an <audio> element at the stream
+    data = request.args if request.method == 'GET' else request.get_json()
     text = data.get('text')
+    lang = data.get('lang') or 'en'
     if not text:
         return jsonify({'error': 'No text provided'}), 400
+    backend = speech_service.backend_for(lang)
+    if backend is None:
+        # The client falls back to the browser's own speech synthesis
+        return jsonify({'error': f'Text-to-speech is not available for {lang}'}), 400
 
-    try:
-        tts = gTTS(text=text, lang='en')
-        with tempfile.TemporaryFile(mode='wb') as f:
-            tts.write_to_fp(f)
-            f.seek(0)
-            audio_data = f.read()
+    start_audio_pregeneration()
+    key = audio_key(text, lang, backend.name)
+    with span('tts_cache'):
+        cached = audio_cache.get(key, backend.extension)
+    if cached:
+        # Served by GET so the browser gets Range, ETag and HTTP caching
+        return redirect(url_for('cached_audio', key=key, extension=backend.extension), code=303)
 
-        return send_file(io.BytesIO(audio_data), mimetype='audio/mp3', as_attachment=True, download_name='output.mp3')
+    try:
+        # Long answers are spoken sentence by sentence; the first one is
+        # fetched here so synthesis errors still produce a 500
+        with span('tts_first_chunk'):
+            chunks = speech_service.synthesize(backend, text, lang)
+            first = next(chunks)
     except Exception as e:
         logging.error(f"Error generating text-to-speech: {str(e)}")
+        upstream_errors_total.inc(upstream=backend.name)
         return jsonify({'error': 'Failed to generate text-to-speech'}), 500
 
+    def audio():
+        yield first
+        yield from chunks
+
+    return Response(
+        audio_cache.write_through(key, audio(), backend.extension),
+        mimetype=backend.mimetype,
+        headers={'ETag': f'"{key}"', 'Content-Disposition': f'attachment; filename=output.{backend.extension}'}
+    )
+
+AUDIO_MIMETYPES = {'mp3': 'audio/mpeg', 'wav': 'audio/wav'}
+
+@app.route('/text_to_speech/<key>.<extension>')
+def cached_audio(key, extension):
+    if extension not in AUDIO_MIMETYPES or len(key) != 64 or not all(c in '0123456789abcdef' for c in key):
+        return jsonify({'error': 'Invalid audio key'}), 404
+    path = audio_cache.path(key, extension)
+    if not os.path.exists(path):
+        return jsonify({'error': 'Audio not found'}), 404
+    # Content-addressed, so the file never changes under this URL
+    return send_file(path, mimetype=AUDIO_MIMETYPES[extension], conditional=True, etag=key, max_age=86400)
+
 @app.route('/admin/export_data')
 @login_required
 def export_data():
-    """Export conversation and feedback data as JSON"""
+    """Stream conversation and feedback data as JSON, NDJSON or CSV.
+
+    Query parameters: ``format`` (json, ndjson or csv), ``table``
+    (conversations, feedback or all; CSV takes a single table), ``since`` and
+    ``until`` (ISO timestamps on created_at) and ``gzip=1``.
+    """
+    fmt = request.args.get('format', 'json')
+    table = request.args.get('table', 'conversations' if fmt == 'csv' else 'all')
+    compress = request.args.get('gzip') in ('1', 'true')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"Unsupported format, use one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    if table != 'all' and table not in EXPORT_TABLES or fmt == 'csv' and table == 'all':
+        return jsonify({'error': 'Unsupported table'}), 400
     try:
-        # Get all conversations
-        conversations = Conversation.query.all()
-        conv_data = []
-        for conv in conversations:
-            conv_data.append({
-                'session_id': conv.session_id,
-                'user_message': conv.user_message,
-                'bot_response': conv.bot_response,
-                'user_language': conv.user_language,
-                'response_time': conv.response_time,
-                'created_at': conv.created_at.isoformat()
-            })
-        
-        # Get all feedback
-        feedback = ResponseFeedback.query.all()
-        feedback_data = []
-        for fb in feedback:
-            feedback_data.append({
-                'qa_id': fb.qa_id,
-                'is_positive': fb.is_positive,
-                'session_id': fb.session_id,
-                'created_at': fb.created_at.isoformat(),
-                'metadata': fb.feedback_metadata
-            })
-        
-        export_data = {
-            'export_date': datetime.utcnow().isoformat(),
-            'conversations': conv_data,
-            'feedback': feedback_data
-        }
-        
-        return jsonify(export_data)
-    except Exception as e:
-        logging.error(f"Error exporting data: {str(e)}")
-        return jsonify({'error': 'Failed to export data'}), 500
+        since = parse_timestamp(request.args.get('since'))
+        until = parse_timestamp(request.args.get('until'))
+    except ValueError:
+        return jsonify({'error': 'since and until must be ISO timestamps'}), 400
+
+    names = list(EXPORT_TABLES) if table == 'all' else [table]
+    filename = f"chatbot_{table}_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.{fmt}"
+    mimetype = {'json': 'application/json', 'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}[fmt]
+    if compress:
+        filename += '.gz'
+        mimetype = 'application/gzip'
+    return Response(
+        stream_with_context(stream_export(fmt, names, since, until, compress)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
 
 @app.route('/admin/clear_cache')
 @login_required
 def clear_cache():
     """Clear the QA cache"""
-    global qa_cache
-    qa_cache.clear()
+    response_cache.clear()
     return jsonify({'message': 'Cache cleared successfully'})
 
 @app.route('/health')
@@ -511,13 +1477,20 @@ def health_check():
             'timestamp': datetime.utcnow().isoformat(),
             'services': {
                 'database': 'ok',
-                'gemini_api': 'ok' if gemini_ok else 'error',
+                'gemini_api': ('degraded' if gemini_pool.breaker.state == 'open' else 'ok') if gemini_ok else 'error',
                 'translate_api': 'ok' if translate_ok else 'error'
             },
             'stats': {
                 'total_qa': total_qa,
                 'total_conversations': total_conversations,
-                'cache_size': len(qa_cache)
+                'cache_size': len(response_cache)
+            },
+            'cache': response_cache.stats(),
+            'write_behind': write_behind.stats(),
+            'clients': {
+                'translate': translate_client.status(),
+                'gemini': gemini_sdk.status(),
+                'language_model': language_model.status()
             }
         }
         
@@ -529,48 +1502,90 @@ def health_check():
             'timestamp': datetime.utcnow().isoformat()
         }), 500
 
+@app.route('/warmup', methods=['GET', 'POST'])
+def warmup():
+    """Load the lazily built clients, models and indexes now instead of on a user's request"""
+    steps = {
+        'language_model': language_model.get,
+        'translate_client': translate_client.get,
+        'gemini': gemini_pool.model,
+        'qa_index': get_qa_index,
+        'semantic_cache': get_semantic_cache,
+        'translation_cache': get_translation_cache,
+        'speech': lambda: speech_service.backend_for('en')
+    }
+    components = {}
+    for name, step in steps.items():
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            components[name] = {'state': 'error', 'error': str(e)}
+            continue
+        components[name] = {'state': 'ready', 'ms': round((time.perf_counter() - start) * 1000, 1)}
+    ready = all(component['state'] == 'ready' for component in components.values())
+    return jsonify({'status': 'ready' if ready else 'degraded', 'components': components})
+
 @app.route('/admin/performance')
 @login_required
 def performance_stats():
     """Performance statistics for admin dashboard"""
     try:
-        # Get response time statistics
-        conversations = Conversation.query.filter(
-            Conversation.response_time.isnot(None)
-        ).all()
-        
-        if conversations:
-            response_times = [conv.response_time for conv in conversations]
-            avg_response_time = sum(response_times) / len(response_times)
-            min_response_time = min(response_times)
-            max_response_time = max(response_times)
-        else:
-            avg_response_time = min_response_time = max_response_time = 0
-        
-        # Get daily conversation counts for the last 7 days
-        daily_stats = []
-        for i in range(7):
-            date = datetime.utcnow() - timedelta(days=i)
-            count = Conversation.query.filter(
-                db.func.date(Conversation.created_at) == date.date()
-            ).count()
-            daily_stats.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'count': count
-            })
+        # Response times and daily counts come from the daily rollups, so this
+        # reads one row per day of history
+        daily = load_rollups('day')
+        totals = summarize(daily)
+        hourly = summarize(load_rollups('hour', since=datetime.utcnow() - timedelta(hours=24)))
+        daily_stats = daily_counts(daily[-7:], 7)
         
         performance_data = {
             'response_times': {
-                'average': round(avg_response_time, 2),
-                'minimum': round(min_response_time, 2),
-                'maximum': round(max_response_time, 2),
-                'total_requests': len(conversations)
+                'average': round(totals['latency_average'], 2),
+                'minimum': round(totals['latency_min'], 2),
+                'maximum': round(totals['latency_max'], 2),
+                'p50': round(totals['latency_p50'], 2),
+                'p95': round(totals['latency_p95'], 2),
+                'p99': round(totals['latency_p99'], 2),
+                'total_requests': totals['latency_count']
             },
-            'daily_stats': list(reversed(daily_stats)),
-            'cache_stats': {
-                'cache_size': len(qa_cache),
-                'cache_hit_rate': 'N/A'  # Would need more sophisticated tracking
-            }
+            'last_24_hours': {
+                'requests': hourly['requests'],
+                'average': round(hourly['latency_average'], 2),
+                'p95': round(hourly['latency_p95'], 2),
+                'positive_feedback': hourly['positive_feedback'],
+                'negative_feedback': hourly['negative_feedback'],
+                'languages': hourly['languages'],
+                'llm_requests': hourly['llm_requests'],
+                'prompt_tokens': hourly['prompt_tokens'],
+                'completion_tokens': hourly['completion_tokens']
+            },
+            'tokens': {
+                'llm_requests': totals['llm_requests'],
+                'prompt_tokens': totals['prompt_tokens'],
+                'completion_tokens': totals['completion_tokens'],
+                'prompt_average': round(totals['prompt_tokens'] / totals['llm_requests'], 1)
+                if totals['llm_requests'] else 0,
+                'completion_average': round(totals['completion_tokens'] / totals['llm_requests'], 1)
+                if totals['llm_requests'] else 0
+            },
+            'prompt_budget': {
+                'context_max_tokens': app.config['CONTEXT_MAX_TOKENS'],
+                'question_max_tokens': app.config['QUESTION_MAX_TOKENS']
+            },
+            'languages': totals['languages'],
+            'daily_stats': daily_stats,
+            'cache_stats': dict(
+                response_cache.stats(),
+                cache_size=len(response_cache),
+                cache_hit_rate=response_cache.stats()['hit_rate']
+            ),
+            'semantic_cache': semantic_cache.stats(),
+            'translation_cache': translation_cache.stats(),
+            'language_detection': language_detector.stats(),
+            'audio_cache': audio_cache.stats(),
+            'speech': speech_service.stats(),
+            'gemini': gemini_pool.stats(),
+            'write_behind': write_behind.stats()
         }
         
         return jsonify(performance_data)
@@ -578,10 +1593,58 @@ def performance_stats():
         logging.error(f"Error getting performance stats: {str(e)}")
         return jsonify({'error': 'Failed to get performance stats'}), 500
 
+# Read from the objects that already keep these numbers, only when scraped
+metrics.gauge('chatbot_write_behind_queue_depth', 'Records waiting to be written',
+              callback=lambda: write_behind.stats()['queue_depth'])
+metrics.counter('chatbot_write_behind_dropped_total', 'Records dropped because the queue was full',
+                callback=lambda: write_behind.stats()['dropped'])
+metrics.gauge('chatbot_write_behind_last_flush_seconds', 'Duration of the last batch write',
+              callback=lambda: write_behind.stats()['last_flush_ms'] / 1000)
+metrics.gauge('chatbot_response_cache_entries', 'Entries in the in-process response cache',
+              callback=lambda: len(response_cache))
+metrics.counter('chatbot_response_cache_lookups_total', 'Response cache lookups by result', ('result',),
+                callback=lambda: {('hit',): response_cache.local.hits, ('miss',): response_cache.local.misses})
+metrics.gauge('chatbot_qa_index_entries', 'Questions in the QA index', callback=lambda: len(qa_index))
+metrics.gauge('chatbot_semantic_cache_entries', 'Questions in the semantic cache', callback=lambda: len(semantic_cache))
+metrics.counter('chatbot_semantic_cache_lookups_total', 'Semantic cache lookups by result', ('result',),
+                callback=lambda: {('hit',): semantic_cache.hits, ('miss',): semantic_cache.misses})
+metrics.gauge('chatbot_translation_memory_entries', 'Translations held in memory',
+              callback=lambda: len(translation_cache.memory))
+metrics.counter('chatbot_translate_upstream_calls_total', 'Requests sent to Google Translate',
+                callback=lambda: translation_cache.upstream_calls)
+metrics.counter('chatbot_gemini_calls_total', 'Calls made to Gemini', callback=lambda: gemini_pool.calls)
+metrics.gauge('chatbot_gemini_circuit_open', '1 while the Gemini circuit breaker is open',
+              callback=lambda: int(gemini_pool.breaker.state == 'open'))
+metrics.gauge('chatbot_audio_cache_bytes', 'Size of the audio cache on disk, once known',
+              callback=lambda: audio_cache.stats()['bytes'] or 0)
+metrics.counter('chatbot_audio_cache_lookups_total', 'Audio cache lookups by result', ('result',),
+                callback=lambda: {('hit',): audio_cache.hits, ('miss',): audio_cache.misses})
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus text exposition of this process's metrics"""
+    token = app.config['METRICS_TOKEN']
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return jsonify({'error': 'Unauthorized'}), 401
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+def log_startup_time():
+    previous = startup_started
+    phases = []
+    for phase, mark in startup_marks:
+        phases.append(f"{phase} {(mark - previous) * 1000:.0f}ms")
+        previous = mark
+    logging.info(f"App loaded in {(previous - startup_started) * 1000:.0f}ms ({', '.join(phases)})")
+
+startup_marks.append(('routes', time.perf_counter()))
+log_startup_time()
+
 if __name__ == '__main__':
     # Create the database tables
     with app.app_context():
         db.create_all()
+        with db.engine.begin() as conn:
+            ensure_qa_fts(conn)
         
         # Create admin user if it doesn't exist
         admin_username = os.getenv('ADMIN_USERNAME')
@@ -0,0 +1,103 @@
+"""Stand-ins for Google Translate, Gemini and gTTS with injected latency and errors"""
+import random
+import threading
+import time
+
+
+class UpstreamError(Exception):
+    pass
+
+
+class Upstream:
+    """Sleep ``latency`` seconds (+/- ``jitter``) and fail ``error_rate`` of calls"""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.calls = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def call(self, name):
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        time.sleep(delay)
+        if failed:
+            raise UpstreamError(f"Injected {name} failure")
+
+    def stats(self):
+        return {'calls': self.calls, 'errors': self.errors}
+
+
+class FakeTranslateClient:
+    def __init__(self, upstream):
+        self.upstream = upstream
+
+    def translate(self, values, target_language='en', **kwargs):
+        self.upstream.call('translate')
+        if isinstance(values, str):
+            return {'translatedText': f'{values} [{target_language}]'}
+        return [{'translatedText': f'{value} [{target_language}]'} for value in values]
+
+
+class _Usage:
+    prompt_token_count = 900
+    candidates_token_count = 120
+    total_token_count = 1020
+
+
+class _Response:
+    usage_metadata = _Usage()
+
+    def __init__(self, text):
+        self.text = text
+
+
+ANSWER = (
+    "Here is how to do that in Canvas:\n"
+    "* Open the course and select **Assignments** in the navigation.\n"
+    "* Choose the assignment and click **Start Assignment**.\n"
+    "* Upload your file or enter your text, then click **Submit Assignment**.\n"
+    "Helpful Resources: https://community.canvaslms.com/"
+)
+
+
+class FakeGenerativeModel:
+    """Drop-in for genai.GenerativeModel; streaming yields the answer in five chunks"""
+
+    upstream = Upstream()
+
+    def __init__(self, model_name=None, generation_config=None, **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self.upstream.call('gemini')
+        if not stream:
+            return _Response(ANSWER)
+        size = len(ANSWER) // 5 + 1
+        return iter([_Response(ANSWER[i:i + size]) for i in range(0, len(ANSWER), size)])
+
+
+class FakeGTTS:
+    """Drop-in for gtts.gTTS; one upstream call per 100 characters, like the real one"""
+
+    upstream = Upstream()
+
+    def __init__(self, text, lang='en', **kwargs):
+        self.text = text
+
+    def stream(self):
+        for i in range(0, len(self.text), 100):
+            self.upstream.call('tts')
+            # Roughly the size of the MP3 gTTS returns for 100 characters
+            yield b'\xff\xfb' * 4096
+
+    def write_to_fp(self, fp):
+        for chunk in self.stream():
+            fp.write(chunk)
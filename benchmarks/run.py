@@ -0,0 +1,320 @@
+"""Throughput and latency benchmarks for the chat and admin endpoints.
+
+Boots the app in-process with fake Google Translate, Gemini and gTTS clients
+(see fakes.py) against a seeded SQLite database, drives each scenario from a
+pool of threads and prints a JSON report:
+
+    python benchmarks/run.py --rows 100000 --concurrency 16 --output bench.json
+
+Compare the JSON files of two commits to spot regressions. Seeded databases
+are kept under --data-dir and reused by later runs with the same --rows.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fakes  # noqa: E402
+
+SCENARIOS = [
+    'chat_hit', 'chat_close_hit', 'chat_miss', 'chat_miss_non_english',
+    'feedback', 'tts', 'admin_performance', 'admin_export',
+]
+
+TOPICS = ['assignment', 'quiz', 'discussion', 'grade', 'module', 'calendar', 'inbox', 'file', 'page', 'rubric']
+ACTIONS = ['submit', 'find', 'edit', 'delete', 'view', 'download', 'share', 'reset', 'upload', 'check']
+
+
+# Misses are built from random words so they do not match each other either
+MISS_WORDS = [
+    'why', 'does', 'canvas', 'show', 'error', 'when', 'opening', 'student', 'teacher', 'mobile', 'app',
+    'browser', 'notification', 'deadline', 'late', 'penalty', 'group', 'peer', 'review', 'comment',
+    'video', 'recording', 'zoom', 'link', 'broken', 'password', 'login', 'account', 'profile', 'picture',
+    'language', 'setting', 'email', 'address', 'syllabus', 'announcement', 'exam', 'score', 'missing',
+    'attendance', 'transcript', 'semester', 'enrollment', 'section', 'advisor', 'library', 'printer',
+]
+MISS_WORDS_ES = [
+    'por', 'qué', 'canvas', 'muestra', 'error', 'cuando', 'abro', 'estudiante', 'profesor', 'aplicación',
+    'móvil', 'navegador', 'aviso', 'fecha', 'límite', 'tarde', 'grupo', 'revisión', 'comentario', 'vídeo',
+    'grabación', 'enlace', 'roto', 'contraseña', 'cuenta', 'perfil', 'foto', 'idioma', 'correo', 'dirección',
+    'examen', 'nota', 'asistencia', 'semestre', 'matrícula', 'sección', 'biblioteca', 'impresora', 'tarea',
+]
+
+
+def miss_question(rng, words=MISS_WORDS):
+    return ' '.join(rng.sample(words, 7)) + f' {uuid.uuid4().hex[:6]}?'
+
+
+def seed_question(i):
+    return f'how do i {ACTIONS[i % len(ACTIONS)]} my {TOPICS[(i // len(ACTIONS)) % len(TOPICS)]} number {i}'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000,
+                        help='QA and conversation rows to seed (e.g. 1000, 100000, 1000000)')
+    parser.add_argument('--requests', type=int, default=200, help='timed requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--gemini-latency', type=float, default=0.8, help='seconds per Gemini call')
+    parser.add_argument('--translate-latency', type=float, default=0.15, help='seconds per Translate call')
+    parser.add_argument('--tts-latency', type=float, default=0.3, help='seconds per 100 characters of speech')
+    parser.add_argument('--jitter', type=float, default=0.2, help='fraction of latency added or removed at random')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of upstream calls that fail')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'chatbot-bench'))
+    parser.add_argument('--output', help='write the JSON report here as well as to stdout')
+    return parser.parse_args()
+
+
+def install_fakes(args):
+    """Replace the upstream clients before app.py imports them"""
+    def upstream(latency):
+        return fakes.Upstream(latency, latency * args.jitter, args.error_rate, seed=args.seed)
+
+    translate_upstream = upstream(args.translate_latency)
+    fakes.FakeGenerativeModel.upstream = upstream(args.gemini_latency)
+    fakes.FakeGTTS.upstream = upstream(args.tts_latency)
+
+    from google.cloud import translate_v2
+    import google.generativeai as genai
+    import gtts
+
+    translate_v2.Client.from_service_account_json = staticmethod(
+        lambda *a, **kw: fakes.FakeTranslateClient(translate_upstream))
+    genai.GenerativeModel = fakes.FakeGenerativeModel
+    genai.configure = lambda **kw: None
+    gtts.gTTS = fakes.FakeGTTS
+    return {
+        'translate': translate_upstream,
+        'gemini': fakes.FakeGenerativeModel.upstream,
+        'tts': fakes.FakeGTTS.upstream,
+    }
+
+
+def configure_environment(args):
+    run_dir = os.path.join(args.data_dir, f'rows-{args.rows}')
+    os.makedirs(run_dir, exist_ok=True)
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(run_dir, 'database.db')}"
+    # Per-run caches, so every run starts cold
+    scratch = tempfile.mkdtemp(prefix='run-', dir=args.data_dir)
+    os.environ['SEMANTIC_CACHE_PATH'] = os.path.join(scratch, 'semantic_cache.npy')
+    os.environ['CACHE_SQLITE_PATH'] = os.path.join(scratch, 'response_cache.sqlite')
+    os.environ['TTS_CACHE_DIR'] = os.path.join(scratch, 'tts_cache')
+    os.environ['TTS_PREGENERATE_TOP'] = '0'
+    os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+    os.environ.setdefault('GOOGLE_APPLICATION_CREDENTIALS_JSON', 'benchmark.json')
+
+
+def seed(app_module, rows, rng, chunk_size=10000):
+    from extensions import db
+    from models import QA, Conversation, ResponseFeedback
+    from qa_listing import ensure_qa_fts
+
+    with app_module.app.app_context():
+        db.create_all()
+        existing = db.session.query(db.func.count(QA.id)).scalar()
+        if existing >= rows:
+            return existing
+        start = time.time()
+        now = datetime.utcnow()
+        with db.engine.begin() as conn:
+            for offset in range(existing, rows, chunk_size):
+                batch = range(offset, min(offset + chunk_size, rows))
+                conn.execute(QA.__table__.insert(), [{
+                    'question': seed_question(i),
+                    'answer': fakes.ANSWER,
+                    'created_at': now,
+                    'updated_at': now,
+                    'times_asked': rng.randint(0, 500),
+                    'positive_feedback': 0,
+                    'negative_feedback': 0,
+                    'priority_score': 0.0
+                } for i in batch])
+                conn.execute(Conversation.__table__.insert(), [{
+                    'session_id': f'seed-{i % 5000}',
+                    'user_message': seed_question(i),
+                    'bot_response': fakes.ANSWER,
+                    'user_language': 'en' if i % 5 else 'es',
+                    'response_time': rng.expovariate(1 / 1.2),
+                    'created_at': now - timedelta(minutes=rng.randint(0, 90 * 24 * 60))
+                } for i in batch])
+                conn.execute(ResponseFeedback.__table__.insert(), [{
+                    'qa_id': i + 1,
+                    'is_positive': rng.random() < 0.8,
+                    'session_id': f'seed-{i % 5000}',
+                    'created_at': now - timedelta(minutes=rng.randint(0, 90 * 24 * 60))
+                } for i in batch if i % 10 == 0])
+            ensure_qa_fts(conn)
+        app_module.rebuild_rollups()
+        print(f"Seeded {rows} rows in {time.time() - start:.1f}s", file=sys.stderr)
+        return rows
+
+
+def rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def build_requests(name, rows, rng):
+    """Return a function making one request of this scenario with a test client"""
+    if name == 'chat_hit':
+        return lambda c: c.post('/get_response', data={
+            'message': seed_question(rng.randrange(rows)), 'session_id': f'bench-{rng.randrange(1000)}'})
+    if name == 'chat_close_hit':
+        return lambda c: c.post('/get_response', data={
+            'message': 'please tell me ' + seed_question(rng.randrange(rows)), 'session_id': f'bench-{rng.randrange(1000)}'})
+    if name == 'chat_miss':
+        return lambda c: c.post('/get_response', data={
+            'message': miss_question(rng),
+            'session_id': f'bench-{rng.randrange(1000)}'})
+    if name == 'chat_miss_non_english':
+        return lambda c: c.post('/get_response', data={
+            'message': '¿' + miss_question(rng, MISS_WORDS_ES),
+            'session_id': f'bench-{rng.randrange(1000)}'})
+    if name == 'feedback':
+        return lambda c: c.post('/submit_feedback', json={
+            'responseId': rng.randrange(1, rows + 1), 'isPositive': rng.random() < 0.8, 'sessionId': 'bench'})
+    if name == 'tts':
+        # Half repeats (cache hits), half new texts
+        return lambda c: c.post('/text_to_speech', json={
+            'text': f'{fakes.ANSWER} {rng.randrange(50) if rng.random() < 0.5 else uuid.uuid4().hex}',
+            'lang': 'en'}, follow_redirects=True)
+    if name == 'admin_performance':
+        return lambda c: c.get('/admin/performance')
+    if name == 'admin_export':
+        since = (datetime.utcnow() - timedelta(days=1)).isoformat()
+        return lambda c: c.get('/admin/export_data', query_string={'format': 'ndjson', 'since': since})
+    raise ValueError(f'Unknown scenario {name}')
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def run_scenario(app, name, rows, args, rng):
+    make_request = build_requests(name, rows, rng)
+    local = threading.local()
+
+    def one(_):
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        start = time.perf_counter()
+        try:
+            response = make_request(local.client)
+            response.get_data()
+            ok = response.status_code < 400
+        except Exception:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    # Warm-up: first-use initialisation (indexes, langid model) is not timed
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(one, range(min(args.concurrency, args.requests))))
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(one, range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, _ in results)
+    errors = sum(1 for _, ok in results if not ok)
+    return {
+        'requests': len(results),
+        'errors': errors,
+        'duration_s': round(elapsed, 3),
+        'requests_per_s': round(len(results) / elapsed, 1),
+        'latency_ms': {
+            'mean': round(statistics.mean(latencies) * 1000, 2),
+            'p50': round(percentile(latencies, 0.50) * 1000, 2),
+            'p95': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99': round(percentile(latencies, 0.99) * 1000, 2),
+            'max': round(latencies[-1] * 1000, 2)
+        },
+        'rss_mb': round(rss_mb(), 1),
+        'rss_growth_mb': round(rss_mb() - rss_before, 1)
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+    configure_environment(args)
+    upstreams = install_fakes(args)
+
+    import app as app_module
+    app = app_module.app
+    app.config['LOGIN_DISABLED'] = True
+    seed(app_module, args.rows, rng)
+
+    report = {
+        'revision': git_revision(),
+        'timestamp': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'config': {
+            'rows': args.rows,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'gemini_latency': args.gemini_latency,
+            'translate_latency': args.translate_latency,
+            'tts_latency': args.tts_latency,
+            'jitter': args.jitter,
+            'error_rate': args.error_rate
+        },
+        'scenarios': {}
+    }
+    for name in args.scenarios.split(','):
+        result = run_scenario(app, name, args.rows, args, rng)
+        report['scenarios'][name] = result
+        print(f"{name:24} {result['requests_per_s']:8.1f} req/s  p50 {result['latency_ms']['p50']:8.1f} ms  "
+              f"p95 {result['latency_ms']['p95']:8.1f} ms  p99 {result['latency_ms']['p99']:8.1f} ms  "
+              f"errors {result['errors']}", file=sys.stderr)
+        # Keep conversation/feedback writes from one scenario out of the next one's numbers
+        with app.app_context():
+            app_module.write_behind.flush()
+
+    report['upstream_calls'] = {name: upstream.stats() for name, upstream in upstreams.items()}
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,605 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+def make_key(*parts, **kwargs):
+    """Stable cache key for any JSON-serialisable arguments.
+
+    Keyword order and dict ordering do not change the key, and the result is the
+    same in every worker process (unlike ``hash()``).
+    """
+    payload = json.dumps([parts, kwargs], sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _estimate_size(value):
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 0
+
+
+class CacheBackend:
+    """Interface shared by the in-process and shared cache tiers.
+
+    ``add`` stores a value only if the key is absent (or expired) and returns
+    whether it did; the tiered cache builds its cross-worker lease on top of it.
+    """
+
+    name = 'base'
+
+    def get(self, key, default=None):
+        raise NotImplementedError
+
+    def peek(self, key):
+        """Read a value without touching hit/miss counters"""
+        return self.get(key)
+
+    def set(self, key, value, ttl=None, tags=()):
+        raise NotImplementedError
+
+    def add(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def invalidate_tag(self, tag):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self):
+        return {}
+
+
+class TTLCache(CacheBackend):
+    """Thread-safe LRU cache with per-entry TTL and tag-based invalidation.
+
+    Bounded by entry count and, optionally, by the approximate pickled size of
+    the stored values. Entries can carry tags (e.g. ``('qa', 12)``) so that
+    everything derived from one QA row can be evicted when it changes.
+    """
+
+    name = 'memory'
+
+    def __init__(self, max_entries=10000, max_bytes=None, default_ttl=3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self.peek(key) is not None
+
+    def peek(self, key):
+        return self.get(key, count=False)
+
+    def get(self, key, default=None, count=True):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+                self._delete(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                if count:
+                    self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            if count:
+                self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, ttl=None, tags=()):
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        size = _estimate_size(value) if self.max_bytes else 0
+        with self._lock:
+            if key in self._entries:
+                self._delete(key)
+            tags = tuple(tags)
+            self._entries[key] = (value, expires_at, size, tags)
+            self._bytes += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            self._evict()
+
+    def add(self, key, value, ttl=None):
+        with self._lock:
+            if self.get(key, count=False) is not None:
+                return False
+            self.set(key, value, ttl=ttl)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            return self._delete(key)
+
+    def _delete(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry[2]
+        for tag in entry[3]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+        return True
+
+    def _evict(self):
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            oldest = next(iter(self._entries))
+            self._delete(oldest)
+            self.evictions += 1
+
+    def invalidate_tag(self, tag):
+        """Drop every entry carrying ``tag``; returns how many were removed"""
+        with self._lock:
+            keys = list(self._tags.get(tag, ()))
+            for key in keys:
+                self._delete(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+
+
+def _tag_name(tag):
+    return json.dumps(tag, default=str, separators=(',', ':'))
+
+
+class SQLiteCache(CacheBackend):
+    """Cache shared by every worker on one machine, stored in a WAL-mode SQLite file.
+
+    Values are pickled. Each thread keeps its own connection; WAL lets readers
+    proceed while another worker is writing.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path, default_ttl=3600, busy_timeout=5.0, purge_every=500):
+        self.path = path
+        self.default_ttl = default_ttl
+        self.busy_timeout = busy_timeout
+        self.purge_every = purge_every
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache '
+                '(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache_tags '
+                '(tag TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (tag, key))'
+            )
+            self._local.conn = conn
+        return conn
+
+    def peek(self, key):
+        row = self._conn().execute(
+            'SELECT value, expires_at FROM cache WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return pickle.loads(row[0])
+
+    def get(self, key, default=None):
+        value = self.peek(key)
+        if value is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def _expires_at(self, ttl):
+        ttl = self.default_ttl if ttl is None else ttl
+        return time.time() + ttl if ttl else None
+
+    def set(self, key, value, ttl=None, tags=()):
+        conn = self._conn()
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                'INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, blob, self._expires_at(ttl))
+            )
+            conn.execute('DELETE FROM cache_tags WHERE key = ?', (key,))
+            conn.executemany(
+                'INSERT OR IGNORE INTO cache_tags (tag, key) VALUES (?, ?)',
+                [(_tag_name(tag), key) for tag in tags]
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        self._maybe_purge()
+
+    def add(self, key, value, ttl=None):
+        conn = self._conn()
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                'DELETE FROM cache WHERE key = ? AND expires_at IS NOT NULL AND expires_at <= ?',
+                (key, time.time())
+            )
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO cache (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, blob, self._expires_at(ttl))
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return cursor.rowcount == 1
+
+    def delete(self, key):
+        conn = self._conn()
+        cursor = conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+        conn.execute('DELETE FROM cache_tags WHERE key = ?', (key,))
+        return cursor.rowcount > 0
+
+    def invalidate_tag(self, tag):
+        conn = self._conn()
+        name = _tag_name(tag)
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            cursor = conn.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache_tags WHERE tag = ?)', (name,)
+            )
+            conn.execute('DELETE FROM cache_tags WHERE tag = ?', (name,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return cursor.rowcount
+
+    def clear(self):
+        conn = self._conn()
+        conn.execute('DELETE FROM cache')
+        conn.execute('DELETE FROM cache_tags')
+
+    def _maybe_purge(self):
+        self._writes += 1
+        if self._writes % self.purge_every:
+            return
+        conn = self._conn()
+        conn.execute(
+            'DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?', (time.time(),)
+        )
+        conn.execute('DELETE FROM cache_tags WHERE key NOT IN (SELECT key FROM cache)')
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        size = self._conn().execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        return {
+            'backend': self.name,
+            'size': size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class RedisCache(CacheBackend):
+    """Shared cache speaking the Redis protocol.
+
+    Pass ``client`` to use an existing (or fake) client; otherwise the optional
+    ``redis`` package is required.
+    """
+
+    name = 'redis'
+
+    def __init__(self, url=None, client=None, prefix='chatbot:', default_ttl=3600):
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+            client = redis.Redis.from_url(url or 'redis://localhost:6379/0')
+        self.client = client
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, key):
+        return self.prefix + key
+
+    def _tag_key(self, tag):
+        return self.prefix + 'tag:' + _tag_name(tag)
+
+    def _ttl(self, ttl):
+        ttl = self.default_ttl if ttl is None else ttl
+        return int(ttl) if ttl else None
+
+    def peek(self, key):
+        blob = self.client.get(self._key(key))
+        return None if blob is None else pickle.loads(blob)
+
+    def get(self, key, default=None):
+        value = self.peek(key)
+        if value is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None, tags=()):
+        ttl = self._ttl(ttl)
+        self.client.set(self._key(key), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ex=ttl)
+        for tag in tags:
+            self.client.sadd(self._tag_key(tag), key)
+
+    def add(self, key, value, ttl=None):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        return bool(self.client.set(self._key(key), blob, ex=self._ttl(ttl), nx=True))
+
+    def delete(self, key):
+        return bool(self.client.delete(self._key(key)))
+
+    def invalidate_tag(self, tag):
+        tag_key = self._tag_key(tag)
+        keys = [k.decode('utf-8') if isinstance(k, bytes) else k for k in self.client.smembers(tag_key)]
+        removed = self.client.delete(*[self._key(k) for k in keys]) if keys else 0
+        self.client.delete(tag_key)
+        return removed
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': self.name,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class TieredCache:
+    """In-process LRU in front of an optional shared backend.
+
+    Reads fall through to the shared tier and repopulate the local one with a
+    short TTL, so invalidations made by another worker are picked up within
+    ``local_ttl`` seconds. ``acquire``/``release`` provide single-flight
+    protection: concurrent misses on one key, across threads and workers, elect
+    one leader to do the expensive work while the rest wait for its result.
+    """
+
+    def __init__(self, local, shared=None, local_ttl=60, lease_ttl=30, poll_interval=0.05):
+        self.local = local
+        self.shared = shared
+        self.local_ttl = local_ttl
+        self.lease_ttl = lease_ttl
+        self.poll_interval = poll_interval
+        self.single_flight_waits = 0
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.local)
+
+    def get(self, key, default=None):
+        value = self.local.get(key)
+        if value is not None or self.shared is None:
+            return default if value is None else value
+        try:
+            value = self.shared.get(key)
+        except Exception as e:
+            logging.error(f"Shared cache read failed: {e}")
+            value = None
+        if value is None:
+            return default
+        self.local.set(key, value, ttl=self.local_ttl)
+        return value
+
+    def set(self, key, value, ttl=None, tags=()):
+        local_ttl = self.local_ttl if self.shared is not None else ttl
+        self.local.set(key, value, ttl=local_ttl, tags=tags)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, value, ttl=ttl, tags=tags)
+            except Exception as e:
+                logging.error(f"Shared cache write failed: {e}")
+
+    def delete(self, key):
+        self.local.delete(key)
+        if self.shared is not None:
+            self.shared.delete(key)
+
+    def invalidate_tag(self, tag):
+        removed = self.local.invalidate_tag(tag)
+        if self.shared is not None:
+            try:
+                removed += self.shared.invalidate_tag(tag)
+            except Exception as e:
+                logging.error(f"Shared cache invalidation failed: {e}")
+        return removed
+
+    def clear(self):
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def acquire(self, key, timeout=None):
+        """Try to become the single worker computing ``key``.
+
+        Returns a lease token for the leader. Followers block until the leader
+        releases (or ``timeout`` elapses) and get None; they should re-read the
+        cache and only compute themselves if the value is still missing.
+        """
+        timeout = self.lease_ttl if timeout is None else timeout
+        with self._inflight_lock:
+            event = self._inflight.get(key)
+            if event is None:
+                event = self._inflight[key] = threading.Event()
+                local_leader = True
+            else:
+                local_leader = False
+        if not local_leader:
+            self.single_flight_waits += 1
+            event.wait(timeout)
+            return None
+
+        token = uuid.uuid4().hex
+        if self.shared is None:
+            return token
+        lease_key = 'lease:' + key
+        try:
+            if self.shared.add(lease_key, token, ttl=self.lease_ttl):
+                return token
+        except Exception as e:
+            logging.error(f"Shared cache lease failed: {e}")
+            return token
+
+        # Another worker holds the lease; wait for it, then let local waiters go too
+        self.single_flight_waits += 1
+        deadline = time.monotonic() + timeout
+        try:
+            while time.monotonic() < deadline:
+                if self.shared.peek(key) is not None or self.shared.peek(lease_key) is None:
+                    break
+                time.sleep(self.poll_interval)
+        finally:
+            self._finish(key)
+        return None
+
+    def release(self, key, token):
+        if token is None:
+            return
+        if self.shared is not None:
+            lease_key = 'lease:' + key
+            try:
+                if self.shared.peek(lease_key) == token:
+                    self.shared.delete(lease_key)
+            except Exception as e:
+                logging.error(f"Shared cache lease release failed: {e}")
+        self._finish(key)
+
+    def _finish(self, key):
+        with self._inflight_lock:
+            event = self._inflight.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def stats(self):
+        local = self.local.stats()
+        stats = {
+            'backend': self.shared.name if self.shared is not None else self.local.name,
+            'size': local['size'],
+            'hits': local['hits'],
+            'misses': local['misses'],
+            'hit_rate': local['hit_rate'],
+            'single_flight_waits': self.single_flight_waits,
+            'local': local
+        }
+        if self.shared is not None:
+            try:
+                shared = self.shared.stats()
+            except Exception as e:
+                shared = {'error': str(e)}
+            stats['shared'] = shared
+            # A local miss that the shared tier answered is still a cache hit
+            shared_hits = shared.get('hits', 0)
+            lookups = local['hits'] + local['misses']
+            stats['hits'] = local['hits'] + shared_hits
+            stats['misses'] = local['misses'] - shared_hits
+            stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+def build_cache(backend='memory', max_entries=10000, max_bytes=None, default_ttl=3600,
+                local_ttl=60, sqlite_path=None, redis_url=None, redis_client=None):
+    """Create the tiered response cache for the configured shared backend"""
+    local = TTLCache(max_entries=max_entries, max_bytes=max_bytes, default_ttl=default_ttl)
+    if backend == 'memory':
+        shared = None
+    elif backend == 'sqlite':
+        shared = SQLiteCache(sqlite_path, default_ttl=default_ttl)
+    elif backend == 'redis':
+        shared = RedisCache(url=redis_url, client=redis_client, default_ttl=default_ttl)
+    else:
+        raise ValueError(f"Unknown cache backend: {backend}")
+    return TieredCache(local, shared, local_ttl=local_ttl)
+
+
+def build_store(namespace, backend='memory', max_entries=10000, default_ttl=3600,
+                sqlite_path=None, redis_url=None, redis_client=None):
+    """A single-tier cache for ``namespace``, kept apart from the response cache.
+
+    It lives in the same kind of backend, so it is shared between workers the
+    same way, but it has its own LRU, SQLite file or Redis prefix. Its entries
+    never evict cached answers, and clearing the response cache leaves them alone.
+    """
+    if backend == 'memory':
+        return TTLCache(max_entries=max_entries, default_ttl=default_ttl)
+    if backend == 'sqlite':
+        root, extension = os.path.splitext(sqlite_path)
+        return SQLiteCache(f"{root}_{namespace}{extension}", default_ttl=default_ttl)
+    if backend == 'redis':
+        return RedisCache(url=redis_url, client=redis_client, prefix=f'chatbot-{namespace}:',
+                          default_ttl=default_ttl)
+    raise ValueError(f"Unknown cache backend: {backend}")
@@ -0,0 +1,155 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+
+from extensions import db
+from models import Conversation, ResponseFeedback
+
+FORMATS = ('json', 'ndjson', 'csv')
+
+# Rows fetched per keyset page and bytes buffered before a chunk is sent
+PAGE_SIZE = 1000
+CHUNK_SIZE = 64 * 1024
+
+
+def _conversation(row):
+    return {
+        'session_id': row.session_id,
+        'user_message': row.user_message,
+        'bot_response': row.bot_response,
+        'user_language': row.user_language,
+        'response_time': row.response_time,
+        'prompt_tokens': row.prompt_tokens,
+        'completion_tokens': row.completion_tokens,
+        'created_at': row.created_at.isoformat() if row.created_at else None
+    }
+
+
+def _feedback(row):
+    return {
+        'qa_id': row.qa_id,
+        'is_positive': row.is_positive,
+        'session_id': row.session_id,
+        'created_at': row.created_at.isoformat() if row.created_at else None,
+        'metadata': row.feedback_metadata
+    }
+
+
+# Export name -> (table, row serializer, CSV columns)
+TABLES = {
+    'conversations': (
+        Conversation.__table__, _conversation,
+        ['session_id', 'user_message', 'bot_response', 'user_language', 'response_time',
+         'prompt_tokens', 'completion_tokens', 'created_at']
+    ),
+    'feedback': (
+        ResponseFeedback.__table__, _feedback,
+        ['qa_id', 'is_positive', 'session_id', 'created_at', 'metadata']
+    ),
+}
+
+
+def parse_timestamp(value):
+    """ISO date or datetime from a query string; raises ValueError if malformed"""
+    if not value:
+        return None
+    return datetime.fromisoformat(value)
+
+
+def iter_rows(conn, name, since=None, until=None, page_size=PAGE_SIZE):
+    """Yield serialized rows one keyset page (``id > last_id``) at a time"""
+    table, serialize, _ = TABLES[name]
+    conditions = []
+    if since is not None:
+        conditions.append(table.c.created_at >= since)
+    if until is not None:
+        conditions.append(table.c.created_at < until)
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            db.select([table])
+            .where(db.and_(table.c.id > last_id, *conditions))
+            .order_by(table.c.id)
+            .limit(page_size)
+        ).fetchall()
+        if not rows:
+            return
+        for row in rows:
+            yield serialize(row)
+        last_id = rows[-1].id
+
+
+def _json_document(conn, names, since, until):
+    yield '{' + f'"export_date": {json.dumps(datetime.utcnow().isoformat())}'
+    for name in names:
+        yield f', {json.dumps(name)}: ['
+        separator = ''
+        for row in iter_rows(conn, name, since, until):
+            yield separator + json.dumps(row)
+            separator = ', '
+        yield ']'
+    yield '}\n'
+
+
+def _ndjson(conn, names, since, until):
+    for name in names:
+        for row in iter_rows(conn, name, since, until):
+            yield json.dumps(dict(row, type=name)) + '\n'
+
+
+def _csv(conn, name, since, until):
+    columns = TABLES[name][2]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in iter_rows(conn, name, since, until):
+        metadata = row.get('metadata')
+        if metadata is not None:
+            row['metadata'] = json.dumps(metadata)
+        writer.writerow([row[column] for column in columns])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _buffered(pieces, compress):
+    """Join small pieces into CHUNK_SIZE byte chunks, gzipping them if asked"""
+    # wbits=31 makes zlib write a gzip header and trailer
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    buffer = []
+    size = 0
+    for piece in pieces:
+        data = piece.encode('utf-8')
+        buffer.append(data)
+        size += len(data)
+        if size >= CHUNK_SIZE:
+            chunk = b''.join(buffer)
+            buffer, size = [], 0
+            chunk = compressor.compress(chunk) if compressor else chunk
+            if chunk:
+                yield chunk
+    chunk = b''.join(buffer)
+    if compressor:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
+
+
+def stream_export(fmt, names, since=None, until=None, compress=False):
+    """Generate the export as byte chunks in constant memory.
+
+    ``json`` keeps the shape of the old single-document export, ``ndjson``
+    writes one object per line tagged with its ``type`` and ``csv`` writes a
+    single table. Reads use a connection of their own, paging by primary key.
+    """
+    with db.engine.connect() as conn:
+        if fmt == 'csv':
+            pieces = _csv(conn, names[0], since, until)
+        elif fmt == 'ndjson':
+            pieces = _ndjson(conn, names, since, until)
+        else:
+            pieces = _json_document(conn, names, since, until)
+        yield from _buffered(pieces, compress)
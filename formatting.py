@@ -0,0 +1,72 @@
+import re
+
+HEADING = re.compile(r'^#{1,6}\s*')
+BULLET = re.compile(r'^[*•]\s*')
+# [description](url) and description (url) both become "description url",
+# the form the system instruction asks for in the resources section
+MARKDOWN_LINK = re.compile(r'\[([^\]\n]+)\]\((https?://[^)\s]+)\)')
+PARENTHESIZED_URL = re.compile(r'\((https?://[^)\s]+)\)')
+
+
+def clean_line(line):
+    """One answer line with markdown emphasis, headings and ``*`` bullets normalized"""
+    line = line.replace('**', '').strip()
+    if not line:
+        return line
+    first = line[0]
+    if first == '#':
+        line = HEADING.sub('', line)
+    elif first == '*' or first == '•':
+        line = BULLET.sub('- ', line)
+    if '://' in line:
+        line = PARENTHESIZED_URL.sub(r'\1', MARKDOWN_LINK.sub(r'\1 \2', line))
+    return line
+
+
+def clean_answer(text):
+    """The stored and displayed form of a generated answer.
+
+    Lines are cleaned independently, so ``StreamingFormatter`` produces the
+    same text from chunks. Leading and trailing blank lines are dropped.
+    """
+    return '\n'.join(clean_line(line) for line in text.split('\n')).strip('\n')
+
+
+def append_follow_up(answer, follow_up_prompt):
+    return f"{answer}\n\n- {follow_up_prompt}"
+
+
+class StreamingFormatter:
+    """Apply ``clean_answer`` to text arriving in arbitrary chunks.
+
+    Each line is emitted once its newline arrives (or on ``flush``), cleaned
+    exactly as ``clean_answer`` would, so joining the output gives the same
+    text as cleaning the whole answer. Blank lines are held back until more
+    text follows, so trailing ones are dropped.
+    """
+
+    def __init__(self):
+        self._buffer = ''
+        self._blank_lines = 0
+        self._started = False
+
+    def feed(self, chunk):
+        lines = (self._buffer + chunk).split('\n')
+        self._buffer = lines.pop()
+        return ''.join(self._emit(line) for line in lines)
+
+    def flush(self):
+        line, self._buffer = self._buffer, ''
+        return self._emit(line)
+
+    def _emit(self, line):
+        line = clean_line(line)
+        if not line:
+            if self._started:
+                self._blank_lines += 1
+            return ''
+        if self._started:
+            line = '\n' * (self._blank_lines + 1) + line
+        self._blank_lines = 0
+        self._started = True
+        return line
@@ -3,6 +3,17 @@ from wtforms import StringField, PasswordField, SubmitField, TextAreaField
 from wtforms.validators import DataRequired, Length, EqualTo, Optional, ValidationError
 import re
 
+QUESTION_MIN_LENGTH = 10
+QUESTION_MAX_LENGTH = 500
+ANSWER_MIN_LENGTH = 20
+
+def normalize_question(question):
+    """Collapse whitespace in a question; raises ValidationError unless it ends with '?'"""
+    question = ' '.join(question.split())
+    if not question.endswith('?'):
+        raise ValidationError('Question must end with a question mark.')
+    return question
+
 class AdminLoginForm(FlaskForm):
     username = StringField('Username', 
                          validators=[DataRequired(), Length(min=4, max=100)],
@@ -15,21 +26,16 @@ class AdminLoginForm(FlaskForm):
 
 class AddQAForm(FlaskForm):
     question = StringField('Question', 
-                         validators=[DataRequired(), Length(min=10, max=500)],
+                         validators=[DataRequired(), Length(min=QUESTION_MIN_LENGTH, max=QUESTION_MAX_LENGTH)],
                          render_kw={"placeholder": "Enter the question", "class": "form-input"})
     answer = TextAreaField('Answer', 
-                         validators=[DataRequired(), Length(min=20)],
+                         validators=[DataRequired(), Length(min=ANSWER_MIN_LENGTH)],
                          render_kw={"placeholder": "Enter the answer", "rows": 5, "class": "form-input"})
     submit = SubmitField('Save Q&A',
                         render_kw={"class": "btn btn-primary"})
 
     def validate_question(self, field):
-        # Remove multiple spaces and normalize whitespace
-        field.data = ' '.join(field.data.split())
-        
-        # Check if question ends with a question mark
-        if not field.data.endswith('?'):
-            raise ValidationError('Question must end with a question mark.')
+        field.data = normalize_question(field.data)
 
 class EditAdminForm(FlaskForm):
     username = StringField('New Username', 
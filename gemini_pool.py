@@ -0,0 +1,164 @@
+import json
+import logging
+import threading
+import time
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Gemini while the circuit breaker is open"""
+
+
+class GeminiBusyError(Exception):
+    """Raised when no concurrency slot frees up before the call deadline"""
+
+
+class CircuitBreaker:
+    """Stop calling a failing upstream for a while.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and every
+    call fails fast for ``reset_timeout`` seconds. Then a single trial call is
+    let through (half-open): success closes the breaker, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.rejected = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logging.warning(f"Gemini circuit breaker opened after {self.failures} failures")
+                self.opened_at = time.monotonic()
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'consecutive_failures': self.failures,
+            'rejected': self.rejected
+        }
+
+
+class GeminiPool:
+    """Long-lived Gemini models shared by all requests in a process.
+
+    Models are built once per (model name, generation config) and reused, so the
+    underlying client and its connections stay warm. Calls are limited to
+    ``max_concurrency`` at a time, carry a per-call deadline and go through a
+    circuit breaker.
+    """
+
+    def __init__(self, model_factory, default_model, default_config,
+                 max_concurrency=16, timeout=20, breaker=None):
+        self.model_factory = model_factory
+        self.default_model = default_model
+        self.default_config = default_config
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.calls = 0
+        self.failures = 0
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def model(self, model_name=None, generation_config=None):
+        model_name = model_name or self.default_model
+        generation_config = generation_config or self.default_config
+        key = (model_name, json.dumps(generation_config, sort_keys=True))
+        model = self._models.get(key)
+        if model is None:
+            with self._lock:
+                model = self._models.get(key)
+                if model is None:
+                    model = self.model_factory(model_name=model_name, generation_config=generation_config)
+                    self._models[key] = model
+        return model
+
+    def _acquire(self):
+        if not self.breaker.allow():
+            raise CircuitOpenError("Gemini circuit breaker is open")
+        if not self._slots.acquire(timeout=self.timeout):
+            # Never reached the upstream, so it says nothing about its health
+            self.breaker.release_trial()
+            raise GeminiBusyError(f"No Gemini slot free within {self.timeout}s")
+        self.calls += 1
+
+    def _failed(self):
+        self.failures += 1
+        self.breaker.record_failure()
+
+    def generate(self, prompt, model_name=None, generation_config=None):
+        model = self.model(model_name, generation_config)
+        self._acquire()
+        try:
+            response = model.generate_content(prompt, request_options={'timeout': self.timeout})
+        except Exception:
+            self._failed()
+            raise
+        finally:
+            self._slots.release()
+        self.breaker.record_success()
+        return response
+
+    def stream(self, prompt, model_name=None, generation_config=None):
+        """Yield response chunks; the slot is held until the stream is exhausted"""
+        model = self.model(model_name, generation_config)
+        self._acquire()
+        try:
+            for chunk in model.generate_content(prompt, stream=True, request_options={'timeout': self.timeout}):
+                yield chunk
+        except GeneratorExit:
+            # Client went away mid-stream; not a verdict on the upstream
+            self.breaker.release_trial()
+            raise
+        except Exception:
+            self._failed()
+            raise
+        else:
+            self.breaker.record_success()
+        finally:
+            self._slots.release()
+
+    def stats(self):
+        return {
+            'models': len(self._models),
+            'calls': self.calls,
+            'failures': self.failures,
+            'circuit_breaker': self.breaker.stats()
+        }
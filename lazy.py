@@ -0,0 +1,50 @@
+import logging
+import threading
+import time
+
+
+class LazyResource:
+    """An expensive client or model, built by ``factory`` on first use.
+
+    Construction happens once, under a lock, in whichever thread asks first.
+    A failed build is logged and raised to that caller but not remembered, so
+    a missing credential only breaks the feature that needs it and the next
+    call tries again.
+    """
+
+    def __init__(self, name, factory):
+        self.name = name
+        self.factory = factory
+        self.init_ms = None
+        self.error = None
+        self._value = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def get(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    start = time.perf_counter()
+                    try:
+                        self._value = self.factory()
+                    except Exception as e:
+                        self.error = str(e)
+                        logging.error(f"Error initializing {self.name}: {e}")
+                        raise
+                    self.init_ms = round((time.perf_counter() - start) * 1000, 1)
+                    self.error = None
+                    self._loaded = True
+                    logging.info(f"Initialized {self.name} in {self.init_ms}ms")
+        return self._value
+
+    def status(self):
+        if self._loaded:
+            return {'state': 'ready', 'init_ms': self.init_ms}
+        if self.error:
+            return {'state': 'error', 'error': self.error}
+        return {'state': 'not_loaded'}
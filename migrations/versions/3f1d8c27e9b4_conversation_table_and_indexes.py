@@ -0,0 +1,44 @@
+"""Create conversation table if missing and add lookup indexes
+
+Revision ID: 3f1d8c27e9b4
+Revises: aa0f4916a356
+Create Date: 2026-10-18 11:52:37.418205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1d8c27e9b4'
+down_revision = 'aa0f4916a356'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created with db.create_all() already have the table; ones
+    # built from the earlier migrations never got it
+    if not sa.inspect(op.get_bind()).has_table('conversation'):
+        op.create_table('conversation',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('session_id', sa.String(length=100), nullable=False),
+        sa.Column('user_message', sa.Text(), nullable=False),
+        sa.Column('bot_response', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('user_language', sa.String(length=10), nullable=True),
+        sa.Column('response_time', sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+    op.create_index('ix_conversation_session_id_created_at', 'conversation', ['session_id', 'created_at'], unique=False)
+    op.create_index('ix_conversation_created_at', 'conversation', ['created_at'], unique=False)
+    op.create_index('ix_conversation_created_day', 'conversation', [sa.text('date(created_at)')], unique=False)
+    op.create_index('ix_response_feedback_qa_id_created_at', 'response_feedback', ['qa_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    # The conversation table is left in place: it may predate this revision
+    op.drop_index('ix_response_feedback_qa_id_created_at', table_name='response_feedback')
+    op.drop_index('ix_conversation_created_day', table_name='conversation')
+    op.drop_index('ix_conversation_created_at', table_name='conversation')
+    op.drop_index('ix_conversation_session_id_created_at', table_name='conversation')
@@ -0,0 +1,51 @@
+"""Add QA sort indexes and the qa_fts full-text index
+
+Revision ID: 8d2f61a0c3e5
+Revises: 5b9e0d4c2a17
+Create Date: 2026-10-18 14:02:11.630948
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2f61a0c3e5'
+down_revision = '5b9e0d4c2a17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keyset pagination compares raw column values, so the sort columns must not be NULL
+    op.execute("UPDATE qa SET times_asked = 0 WHERE times_asked IS NULL")
+    op.execute("UPDATE qa SET positive_feedback = 0 WHERE positive_feedback IS NULL")
+    op.execute("UPDATE qa SET negative_feedback = 0 WHERE negative_feedback IS NULL")
+    op.execute("UPDATE qa SET priority_score = 0 WHERE priority_score IS NULL")
+    op.execute("UPDATE qa SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE updated_at IS NULL")
+    op.create_index(op.f('ix_qa_times_asked'), 'qa', ['times_asked'], unique=False)
+    op.create_index(op.f('ix_qa_priority_score'), 'qa', ['priority_score'], unique=False)
+    op.create_index(op.f('ix_qa_updated_at'), 'qa', ['updated_at'], unique=False)
+
+    # Kept in sync with qa_listing.QA_FTS_DDL
+    op.execute("CREATE VIRTUAL TABLE qa_fts USING fts5(question, answer, content='qa', content_rowid='id')")
+    op.execute("""CREATE TRIGGER qa_fts_ai AFTER INSERT ON qa BEGIN
+        INSERT INTO qa_fts(rowid, question, answer) VALUES (new.id, new.question, new.answer);
+    END""")
+    op.execute("""CREATE TRIGGER qa_fts_ad AFTER DELETE ON qa BEGIN
+        INSERT INTO qa_fts(qa_fts, rowid, question, answer) VALUES ('delete', old.id, old.question, old.answer);
+    END""")
+    op.execute("""CREATE TRIGGER qa_fts_au AFTER UPDATE OF question, answer ON qa BEGIN
+        INSERT INTO qa_fts(qa_fts, rowid, question, answer) VALUES ('delete', old.id, old.question, old.answer);
+        INSERT INTO qa_fts(rowid, question, answer) VALUES (new.id, new.question, new.answer);
+    END""")
+    op.execute("INSERT INTO qa_fts(qa_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS qa_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS qa_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS qa_fts_ai")
+    op.execute("DROP TABLE IF EXISTS qa_fts")
+    op.drop_index(op.f('ix_qa_updated_at'), table_name='qa')
+    op.drop_index(op.f('ix_qa_priority_score'), table_name='qa')
+    op.drop_index(op.f('ix_qa_times_asked'), table_name='qa')
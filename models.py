@@ -20,11 +20,11 @@ class QA(db.Model):
     question = db.Column(db.String(500), unique=True, nullable=False)
     answer = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    times_asked = db.Column(db.Integer, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    times_asked = db.Column(db.Integer, default=0, index=True)
     positive_feedback = db.Column(db.Integer, default=0)
     negative_feedback = db.Column(db.Integer, default=0)
-    priority_score = db.Column(db.Float, default=0.0)
+    priority_score = db.Column(db.Float, default=0.0, index=True)
 
     def increment_asked(self):
         self.times_asked += 1
@@ -39,16 +39,39 @@ class QA(db.Model):
         db.session.commit()
 
     def _update_priority_score(self):
-        total_feedback = self.positive_feedback + self.negative_feedback
+        self.priority_score = self.compute_priority_score(self.positive_feedback, self.negative_feedback)
+
+    @staticmethod
+    def compute_priority_score(positive_feedback, negative_feedback):
+        total_feedback = positive_feedback + negative_feedback
         if total_feedback > 0:
-            positive_ratio = self.positive_feedback / total_feedback
-            self.priority_score = positive_ratio * (1 + total_feedback / 100)
-        else:
-            self.priority_score = 0.0
+            positive_ratio = positive_feedback / total_feedback
+            return positive_ratio * (1 + total_feedback / 100)
+        return 0.0
 
     def __repr__(self):
         return f'<QA {self.question[:50]}...>'
 
+class QATranslation(db.Model):
+    """A QA pair as asked and answered in another language"""
+    __tablename__ = 'qa_translation'
+    id = db.Column(db.Integer, primary_key=True)
+    qa_id = db.Column(db.Integer, db.ForeignKey('qa.id', ondelete='CASCADE'), nullable=False)
+    lang = db.Column(db.String(10), nullable=False)
+    question = db.Column(db.String(500), nullable=False)
+    answer = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    qa = db.relationship('QA', backref=db.backref('translations', lazy=True, cascade='all, delete-orphan'))
+
+    __table_args__ = (
+        db.UniqueConstraint('lang', 'question', name='uq_qa_translation_lang_question'),
+        db.Index('ix_qa_translation_qa_id_lang', 'qa_id', 'lang'),
+    )
+
+    def __repr__(self):
+        return f'<QATranslation {self.lang} {self.question[:50]}...>'
+
 class ResponseFeedback(db.Model):
     __tablename__ = 'response_feedback'  # Explicitly define table name
     id = db.Column(db.Integer, primary_key=True)
@@ -60,6 +83,10 @@ class ResponseFeedback(db.Model):
 
     qa = db.relationship('QA', backref=db.backref('feedbacks', lazy=True))
 
+    __table_args__ = (
+        db.Index('ix_response_feedback_qa_id_created_at', 'qa_id', 'created_at'),
+    )
+
 class Conversation(db.Model):
     __tablename__ = 'conversation'
     id = db.Column(db.Integer, primary_key=True)
@@ -69,6 +96,58 @@ class Conversation(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user_language = db.Column(db.String(10), default='en')
     response_time = db.Column(db.Float)  # Response time in seconds
+    prompt_tokens = db.Column(db.Integer)  # Gemini usage; NULL for stored answers
+    completion_tokens = db.Column(db.Integer)
+
+    __table_args__ = (
+        # Recent context for a session
+        db.Index('ix_conversation_session_id_created_at', 'session_id', 'created_at'),
+        db.Index('ix_conversation_created_at', 'created_at'),
+        # Day bucket used by the daily statistics
+        db.Index('ix_conversation_created_day', db.func.date(created_at)),
+    )
     
     def __repr__(self):
-        return f'<Conversation {self.session_id[:10]}...>'
\ No newline at end of file
+        return f'<Conversation {self.session_id[:10]}...>'
+
+class TranslationMemory(db.Model):
+    __tablename__ = 'translation_memory'
+    id = db.Column(db.Integer, primary_key=True)
+    text_hash = db.Column(db.String(64), nullable=False)  # sha256 of source_text
+    target_lang = db.Column(db.String(10), nullable=False)
+    source_text = db.Column(db.Text, nullable=False)
+    translated_text = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('text_hash', 'target_lang', name='uq_translation_memory_hash_lang'),
+    )
+
+    def __repr__(self):
+        return f'<TranslationMemory {self.target_lang} {self.text_hash[:10]}...>'
+
+class UsageRollup(db.Model):
+    """Pre-aggregated request, latency and feedback counts for one hour or day"""
+    __tablename__ = 'usage_rollup'
+    id = db.Column(db.Integer, primary_key=True)
+    granularity = db.Column(db.String(10), nullable=False)  # 'hour' or 'day'
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    requests = db.Column(db.Integer, nullable=False, default=0)
+    latency_count = db.Column(db.Integer, nullable=False, default=0)
+    latency_sum = db.Column(db.Float, nullable=False, default=0.0)
+    latency_min = db.Column(db.Float)
+    latency_max = db.Column(db.Float)
+    latency_histogram = db.Column(db.JSON)  # counts per rollups.LATENCY_BUCKETS bucket
+    positive_feedback = db.Column(db.Integer, nullable=False, default=0)
+    negative_feedback = db.Column(db.Integer, nullable=False, default=0)
+    languages = db.Column(db.JSON)  # {language: requests}
+    llm_requests = db.Column(db.Integer, nullable=False, default=0)  # requests with Gemini token counts
+    prompt_tokens = db.Column(db.Integer, nullable=False, default=0)
+    completion_tokens = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('granularity', 'bucket_start', name='uq_usage_rollup_granularity_bucket'),
+    )
+
+    def __repr__(self):
+        return f'<UsageRollup {self.granularity} {self.bucket_start}>'
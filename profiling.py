@@ -0,0 +1,171 @@
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+OTHER_STACKS = '[other stacks]'
+
+
+class _ActiveRequest:
+    __slots__ = ('endpoint', 'path', 'started', 'samples')
+
+    def __init__(self, endpoint, path):
+        self.endpoint = endpoint
+        self.path = path
+        self.started = time.time()
+        self.samples = 0
+
+
+class EndpointProfile:
+    """Collapsed stacks of one endpoint: ``"outer;...;inner" -> samples``"""
+
+    def __init__(self, max_stacks):
+        self.max_stacks = max_stacks
+        self.stacks = {}
+        self.samples = 0
+        self.requests = 0
+
+    def add(self, stack):
+        self.samples += 1
+        if stack not in self.stacks and len(self.stacks) >= self.max_stacks:
+            # Keep the total honest without letting rare stacks grow memory
+            stack = OTHER_STACKS
+        self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+    def top_frames(self, limit=20):
+        """Hottest frames as (frame, self samples, total samples), by self time"""
+        own = {}
+        total = {}
+        for stack, count in self.stacks.items():
+            frames = stack.split(';')
+            own[frames[-1]] = own.get(frames[-1], 0) + count
+            # A recursive frame counts once per sample
+            for frame in set(frames):
+                total[frame] = total.get(frame, 0) + count
+        ranked = sorted(own, key=own.get, reverse=True)[:limit]
+        return [(frame, own[frame], total[frame]) for frame in ranked]
+
+    def collapsed(self):
+        """Brendan Gregg's folded format, readable by flamegraph.pl and speedscope"""
+        lines = sorted(f'{stack} {count}' for stack, count in self.stacks.items())
+        return '\n'.join(lines) + '\n' if lines else ''
+
+
+class SamplingProfiler:
+    """Statistical profiler for individual requests.
+
+    Request threads register themselves with ``start`` and ``stop``. While any
+    are registered, one daemon thread wakes every ``interval`` seconds, reads
+    every thread's current stack from ``sys._current_frames()`` and counts the
+    stacks of the registered ones under their endpoint. Nothing is traced, so
+    a profiled request runs at full speed; requests that are not profiled pay
+    nothing at all.
+    """
+
+    def __init__(self, interval=0.01, max_stacks=2000, history=50):
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self.profiles = {}
+        self.recent = deque(maxlen=history)
+        self._active = {}
+        self._labels = {}
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self, endpoint, path):
+        with self._lock:
+            self._active[threading.get_ident()] = _ActiveRequest(endpoint, path)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+                self._thread.start()
+            self._wake.set()
+
+    def stop(self):
+        with self._lock:
+            request = self._active.pop(threading.get_ident(), None)
+            if request is None:
+                return
+            profile = self._profile(request.endpoint)
+            profile.requests += 1
+            self.recent.appendleft({
+                'endpoint': request.endpoint,
+                'path': request.path,
+                'started': datetime.utcfromtimestamp(request.started).strftime('%Y-%m-%d %H:%M:%S'),
+                'duration_ms': round((time.time() - request.started) * 1000, 1),
+                'samples': request.samples
+            })
+
+    def _profile(self, endpoint):
+        profile = self.profiles.get(endpoint)
+        if profile is None:
+            profile = self.profiles[endpoint] = EndpointProfile(self.max_stacks)
+        return profile
+
+    def _run(self):
+        idle = True
+        while True:
+            self._wake.wait()
+            # Coming out of idle, start at a random phase so requests shorter
+            # than the interval are still sampled in proportion to their length
+            time.sleep(random.uniform(0, self.interval) if idle else self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, request in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        request.samples += 1
+                        self._profile(request.endpoint).add(self._collapse(frame))
+                idle = not self._active
+                if idle:
+                    # Cleared under the lock, so a concurrent start() cannot be missed
+                    self._wake.clear()
+            del frames
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            # Last two path components tell app.py from site-packages/x/__init__.py
+            filename = os.path.join(*code.co_filename.split(os.sep)[-2:]) if code.co_filename else '?'
+            label = self._labels[code] = f'{code.co_name} ({filename}:{code.co_firstlineno})'
+        return label
+
+    def _collapse(self, frame):
+        frames = []
+        while frame is not None:
+            frames.append(self._label(frame.f_code))
+            frame = frame.f_back
+        frames.reverse()
+        return ';'.join(frames)
+
+    def reset(self):
+        with self._lock:
+            self.profiles = {}
+            self.recent.clear()
+
+    def summary(self, top=15):
+        with self._lock:
+            return [
+                {
+                    'endpoint': endpoint,
+                    'requests': profile.requests,
+                    'samples': profile.samples,
+                    'stacks': len(profile.stacks),
+                    'top_frames': profile.top_frames(top)
+                }
+                for endpoint, profile in sorted(self.profiles.items(), key=lambda item: -item[1].samples)
+            ]
+
+    def collapsed(self, endpoint=None):
+        """Folded stacks for one endpoint, or for all of them with the endpoint as root frame"""
+        with self._lock:
+            if endpoint is not None:
+                profile = self.profiles.get(endpoint)
+                return profile.collapsed() if profile else None
+            return ''.join(
+                ''.join(f'{endpoint};{line}\n' for line in profile.collapsed().splitlines())
+                for endpoint, profile in sorted(self.profiles.items())
+            )
@@ -0,0 +1,50 @@
+# Characters per token for English prose; close enough to budget a prompt
+CHARS_PER_TOKEN = 4
+
+# Sent as the model's system instruction. The model is built once per process
+# (see GeminiPool), so this text is never re-assembled per request.
+SYSTEM_INSTRUCTION = """You are a Canvas LMS expert helping students with questions about Canvas.
+
+Your response must:
+1. Start with "Hi!" or a similar greeting on the first line
+2. Follow with a brief introduction sentence
+3. Use ONLY dash/hyphen (-) for bullet points (not *, • or **), each on a new line
+4. Only answer questions about Canvas LMS
+5. End with a section starting with "Helpful Resources:", one resource per line starting with "-", the link description first and no parentheses
+
+Always include these resources:
+-Official Canvas Student Guide https://www.umb.edu/it/training-classroom-support/canvas-resources-for-students
+-UMB Canvas Support Page https://cases.canvaslms.com/liveagentchat?chattype=student&sfid=A5WgTEKARcWFY5IXRv5FT8ePIss19I2qCvHxwOtD"""
+
+NO_CONTEXT = "No previous context"
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate(text, max_tokens):
+    """``text`` cut to about ``max_tokens`` tokens, on a word boundary where possible"""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars - 3]
+    space = cut.rfind(' ')
+    if space > max_chars // 2:
+        cut = cut[:space]
+    return cut.rstrip() + '...'
+
+
+def build_prompt(question, context_messages, max_question_tokens):
+    """The per-request prompt: recent conversation and the (length-capped) question"""
+    context_text = "\n".join(context_messages) if context_messages else NO_CONTEXT
+    return f"Previous conversation context:\n{context_text}\n\nQuestion: {truncate(question, max_question_tokens)}"
+
+
+def token_usage(response):
+    """Prompt and completion token counts Gemini reported, as Conversation columns"""
+    usage = getattr(response, 'usage_metadata', None)
+    return {
+        'prompt_tokens': getattr(usage, 'prompt_token_count', None) or None,
+        'completion_tokens': getattr(usage, 'candidates_token_count', None) or None
+    }
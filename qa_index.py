@@ -0,0 +1,145 @@
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Words that carry no meaning for matching Canvas questions. Dropping them keeps
+# the posting lists short, so a lookup only touches questions sharing real terms.
+STOPWORDS = frozenset("""
+a an and are as at be but by can could do does for from how i if in is it me my
+of on or please should so that the there this to was what when where which who
+why will with would you your
+""".split())
+
+
+def normalize_question(text):
+    """Lowercase and collapse whitespace, the same way stored questions are kept"""
+    return ' '.join((text or '').lower().split())
+
+
+def _stem(token):
+    # Very light plural folding so "grades" and "grade" share a posting list
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    tokens = [_stem(t) for t in TOKEN_RE.findall(normalize_question(text))]
+    meaningful = [t for t in tokens if t not in STOPWORDS]
+    # A question made only of stopwords still needs something to match on
+    return meaningful or tokens
+
+
+class QAIndex:
+    """In-memory BM25 index over QA.question.
+
+    Scores are normalised to 0..1 (roughly the share of the query's information
+    found in the stored question), so ``threshold`` can be tuned independently of
+    the size of the knowledge base.
+    """
+
+    def __init__(self, threshold=0.6, k1=1.2, b=0.75):
+        self.threshold = threshold
+        self.k1 = k1
+        self.b = b
+        self.loaded = False
+        self._lock = threading.RLock()
+        self._exact = {}
+        self._docs = {}
+        self._postings = defaultdict(dict)
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._docs)
+
+    def build(self, rows):
+        """Replace the index contents with (qa_id, question) rows"""
+        with self._lock:
+            self._exact.clear()
+            self._docs.clear()
+            self._postings.clear()
+            self._total_length = 0
+            for qa_id, question in rows:
+                self._add(qa_id, question)
+            self.loaded = True
+
+    def add(self, qa_id, question):
+        """Insert or update a single question"""
+        with self._lock:
+            self._remove(qa_id)
+            self._add(qa_id, question)
+
+    def remove(self, qa_id):
+        with self._lock:
+            self._remove(qa_id)
+
+    def _add(self, qa_id, question):
+        normalized = normalize_question(question)
+        counts = Counter(tokenize(normalized))
+        length = sum(counts.values())
+        self._docs[qa_id] = (normalized, counts, length)
+        self._exact[normalized] = qa_id
+        for token, tf in counts.items():
+            self._postings[token][qa_id] = tf
+        self._total_length += length
+
+    def _remove(self, qa_id):
+        doc = self._docs.pop(qa_id, None)
+        if doc is None:
+            return
+        normalized, counts, length = doc
+        if self._exact.get(normalized) == qa_id:
+            del self._exact[normalized]
+        for token in counts:
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(qa_id, None)
+                if not postings:
+                    del self._postings[token]
+        self._total_length -= length
+
+    def _idf(self, token):
+        df = len(self._postings.get(token, ()))
+        n = len(self._docs)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query, limit=5):
+        """Return up to ``limit`` (qa_id, score) pairs, best first"""
+        with self._lock:
+            normalized = normalize_question(query)
+            exact_id = self._exact.get(normalized)
+            if exact_id is not None:
+                return [(exact_id, 1.0)]
+            if not self._docs:
+                return []
+
+            query_terms = set(tokenize(normalized))
+            avg_length = self._total_length / len(self._docs) or 1.0
+            max_score = 0.0
+            scores = defaultdict(float)
+            for token in query_terms:
+                idf = self._idf(token)
+                max_score += idf
+                for qa_id, tf in self._postings.get(token, {}).items():
+                    length = self._docs[qa_id][2]
+                    norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+                    # BM25 rewards a term found in a short question with more
+                    # than its idf; capping it keeps the score a share of the
+                    # query's idf mass, so one shared word cannot match
+                    scores[qa_id] += min(idf * tf * (self.k1 + 1) / (tf + norm), idf)
+
+            if not scores or max_score <= 0:
+                return []
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+            return [(qa_id, min(score / max_score, 1.0)) for qa_id, score in ranked]
+
+    def best_match(self, query, threshold=None):
+        """Return the id of the closest stored question, or None below the threshold"""
+        threshold = self.threshold if threshold is None else threshold
+        results = self.search(query, limit=1)
+        if results and results[0][1] >= threshold:
+            return results[0][0]
+        return None
@@ -0,0 +1,175 @@
+import base64
+import json
+import re
+from datetime import datetime
+
+from extensions import db
+from models import QA
+
+# Columns the admin tables can be sorted by; each is indexed
+SORT_COLUMNS = {
+    'id': QA.id,
+    'question': QA.question,
+    'times_asked': QA.times_asked,
+    'priority_score': QA.priority_score,
+    'updated_at': QA.updated_at,
+}
+MAX_PAGE_SIZE = 200
+
+# External-content FTS5 index over qa, kept in sync by triggers. The update
+# trigger only fires for question/answer, not for the counter updates.
+QA_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS qa_fts USING fts5(question, answer, content='qa', content_rowid='id')",
+    """CREATE TRIGGER IF NOT EXISTS qa_fts_ai AFTER INSERT ON qa BEGIN
+        INSERT INTO qa_fts(rowid, question, answer) VALUES (new.id, new.question, new.answer);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS qa_fts_ad AFTER DELETE ON qa BEGIN
+        INSERT INTO qa_fts(qa_fts, rowid, question, answer) VALUES ('delete', old.id, old.question, old.answer);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS qa_fts_au AFTER UPDATE OF question, answer ON qa BEGIN
+        INSERT INTO qa_fts(qa_fts, rowid, question, answer) VALUES ('delete', old.id, old.question, old.answer);
+        INSERT INTO qa_fts(rowid, question, answer) VALUES (new.id, new.question, new.answer);
+    END""",
+]
+
+
+QA_FTS_TRIGGERS = ('qa_fts_ai', 'qa_fts_ad', 'qa_fts_au')
+
+
+def has_qa_fts(conn):
+    return conn.dialect.name == 'sqlite' and conn.execute(
+        db.text("SELECT 1 FROM sqlite_master WHERE name = 'qa_fts'")).first() is not None
+
+
+def suspend_qa_fts(conn):
+    """Drop the sync triggers before a bulk load; ``resume_qa_fts`` puts them back"""
+    for name in QA_FTS_TRIGGERS:
+        conn.execute(db.text(f"DROP TRIGGER IF EXISTS {name}"))
+
+
+def resume_qa_fts(conn, rebuild=True):
+    """Recreate the sync triggers and, if rows changed meanwhile, rebuild the index from qa"""
+    for statement in QA_FTS_DDL:
+        conn.execute(db.text(statement))
+    if rebuild:
+        conn.execute(db.text("INSERT INTO qa_fts(qa_fts) VALUES ('rebuild')"))
+
+
+def ensure_qa_fts(conn):
+    """Create the search index and its triggers if missing (for create_all databases)"""
+    exists = conn.execute(db.text("SELECT 1 FROM sqlite_master WHERE name = 'qa_fts'")).first()
+    for statement in QA_FTS_DDL:
+        conn.execute(db.text(statement))
+    if not exists:
+        conn.execute(db.text("INSERT INTO qa_fts(qa_fts) VALUES ('rebuild')"))
+
+
+def fts_query(text):
+    """Turn free text into an FTS5 query: every word must match, as a prefix"""
+    words = re.findall(r'\w+', text.lower())
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def like_filter(text):
+    """Fallback for databases without qa_fts: every word must appear in the question or answer"""
+    conditions = []
+    for word in re.findall(r'\w+', text.lower()):
+        pattern = '%' + word.replace('_', '\\_') + '%'
+        conditions.append(db.or_(QA.question.ilike(pattern, escape='\\'), QA.answer.ilike(pattern, escape='\\')))
+    return db.and_(*conditions)
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Cursor from the previous page; raises ValueError if it was tampered with"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != 2:
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def _serialize(qa, rank=None):
+    item = {
+        'id': qa.id,
+        'question': qa.question,
+        'answer': qa.answer[:200],
+        'times_asked': qa.times_asked or 0,
+        'positive_feedback': qa.positive_feedback or 0,
+        'negative_feedback': qa.negative_feedback or 0,
+        'priority_score': qa.priority_score or 0.0,
+        'updated_at': qa.updated_at.isoformat() if qa.updated_at else None
+    }
+    if rank is not None:
+        item['rank'] = rank
+    return item
+
+
+def list_qas(sort='id', direction='desc', cursor=None, limit=50, search=None):
+    """One page of QAs ordered by ``sort`` then id, resuming after ``cursor``.
+
+    With ``search`` the rows are restricted to FTS matches; ``sort='relevance'``
+    orders them by bm25 rank instead of a column. Databases without qa_fts
+    (created with create_all, or not SQLite) fall back to LIKE matching, and
+    relevance to id order. Returns (items, next_cursor).
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    after = decode_cursor(cursor) if cursor else None
+    match = fts_query(search) if search else ''
+    if search and not match:
+        return [], None
+    fts = bool(match) and has_qa_fts(db.session.connection())
+
+    if match and sort == 'relevance':
+        if fts:
+            return _list_by_relevance(match, after, limit)
+        sort = 'id'
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f'Cannot sort by {sort}')
+
+    column = SORT_COLUMNS[sort]
+    if after is not None and sort == 'updated_at':
+        after[0] = datetime.fromisoformat(after[0])
+    key = db.tuple_(column, QA.id)
+    query = QA.query
+    if match and not fts:
+        query = query.filter(like_filter(search))
+    elif match:
+        query = query.filter(QA.id.in_(
+            db.select([db.column('rowid')]).select_from(db.table('qa_fts')).where(db.text('qa_fts MATCH :match'))
+        )).params(match=match)
+    if after is not None:
+        query = query.filter(key < db.tuple_(*after) if direction == 'desc' else key > db.tuple_(*after))
+    order = [column.desc(), QA.id.desc()] if direction == 'desc' else [column.asc(), QA.id.asc()]
+    rows = query.order_by(*order).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = _serialize(rows[-1])
+        next_cursor = encode_cursor([last[sort], last['id']])
+    return [_serialize(qa) for qa in rows], next_cursor
+
+
+def _list_by_relevance(match, after, limit):
+    keyset = ''
+    params = {'match': match, 'limit': limit + 1}
+    if after is not None:
+        keyset = 'AND (rank > :rank OR (rank = :rank AND rowid > :last_id))'
+        params.update(rank=after[0], last_id=after[1])
+    ranked = db.session.execute(db.text(
+        f"SELECT rowid, rank FROM qa_fts WHERE qa_fts MATCH :match {keyset} ORDER BY rank, rowid LIMIT :limit"
+    ), params).fetchall()
+
+    next_cursor = None
+    if len(ranked) > limit:
+        ranked = ranked[:limit]
+        next_cursor = encode_cursor([ranked[-1].rank, ranked[-1].rowid])
+    qas = {qa.id: qa for qa in QA.query.filter(QA.id.in_([row.rowid for row in ranked]))}
+    return [_serialize(qas[row.rowid], row.rank) for row in ranked if row.rowid in qas], next_cursor
+
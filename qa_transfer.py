@@ -0,0 +1,243 @@
+import csv
+import json
+import os
+import re
+from datetime import datetime
+
+from extensions import db
+from formatting import clean_answer
+from forms import ANSWER_MIN_LENGTH, QUESTION_MAX_LENGTH, QUESTION_MIN_LENGTH, normalize_question
+from models import QA, QATranslation
+from qa_listing import has_qa_fts, resume_qa_fts, suspend_qa_fts
+
+FORMATS = ('json', 'ndjson', 'csv')
+EXTENSIONS = {'.json': 'json', '.ndjson': 'ndjson', '.jsonl': 'ndjson', '.csv': 'csv'}
+
+BATCH_SIZE = 5000
+# Bound parameters per IN (...) lookup, well under SQLite's limit
+LOOKUP_CHUNK = 500
+READ_SIZE = 64 * 1024
+MAX_REPORTED_ERRORS = 10
+
+SEPARATORS = re.compile(r'[\s,]*')
+
+
+def format_for(path):
+    """Import/export format implied by a file name, or None"""
+    return EXTENSIONS.get(os.path.splitext(path)[1].lower())
+
+
+def _json_array(stream):
+    """Items of a top-level JSON array, decoded one at a time from ``stream``"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    started = False
+    while True:
+        pos = SEPARATORS.match(buffer, pos).end()
+        if pos < len(buffer):
+            if not started:
+                if buffer[pos] != '[':
+                    raise ValueError('Expected a JSON array of question/answer objects')
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == ']':
+                return
+            try:
+                item, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Most likely an object cut off at the end of the buffer
+                pass
+            else:
+                yield item
+                continue
+        more = stream.read(READ_SIZE)
+        if not more:
+            raise ValueError('JSON array is truncated or malformed')
+        buffer = buffer[pos:] + more
+        pos = 0
+
+
+def _ndjson(stream):
+    for line in stream:
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # Rejected by prepare, so one bad line does not stop the load
+                yield line
+
+
+def read_records(stream, fmt):
+    """Question/answer mappings from a JSON array, NDJSON or CSV text stream"""
+    if fmt == 'csv':
+        return csv.DictReader(stream)
+    if fmt == 'ndjson':
+        return _ndjson(stream)
+    return _json_array(stream)
+
+
+def prepare(record, clean=True):
+    """(question, answer) as the admin form would store them; raises ValueError if invalid"""
+    if not isinstance(record, dict):
+        raise ValueError('Expected an object with question and answer')
+    question = (record.get('question') or '').strip()
+    answer = (record.get('answer') or '').strip()
+    if not question or not answer:
+        raise ValueError('Missing question or answer')
+    question = normalize_question(question).lower()
+    if not QUESTION_MIN_LENGTH <= len(question) <= QUESTION_MAX_LENGTH:
+        raise ValueError(f'Question must be {QUESTION_MIN_LENGTH} to {QUESTION_MAX_LENGTH} characters')
+    if clean:
+        answer = clean_answer(answer)
+    if len(answer) < ANSWER_MIN_LENGTH:
+        raise ValueError(f'Answer must be at least {ANSWER_MIN_LENGTH} characters')
+    return question, answer
+
+
+def _upsert_statement(conn):
+    if conn.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif conn.dialect.name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f'Bulk import does not support {conn.dialect.name} databases')
+    statement = insert(QA.__table__)
+    return statement.on_conflict_do_update(
+        index_elements=['question'],
+        set_={'answer': statement.excluded.answer, 'updated_at': statement.excluded.updated_at}
+    )
+
+
+class ImportResult:
+    def __init__(self):
+        self.read = 0
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.skipped = 0
+        self.errors = []
+        self.changed_ids = []
+
+    def skip(self, number, error):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f'record {number}: {error}')
+
+
+def _write_batch(conn, statement, batch, result):
+    """Upsert one batch of {question: answer} in the caller's transaction"""
+    table = QA.__table__
+    questions = list(batch)
+    existing = {}
+    for i in range(0, len(questions), LOOKUP_CHUNK):
+        rows = conn.execute(
+            db.select([table.c.question, table.c.id, table.c.answer])
+            .where(table.c.question.in_(questions[i:i + LOOKUP_CHUNK]))
+        )
+        existing.update((row.question, row) for row in rows)
+
+    now = datetime.utcnow()
+    rows = []
+    changed = []
+    for question, answer in batch.items():
+        current = existing.get(question)
+        if current is None:
+            result.inserted += 1
+        elif current.answer == answer:
+            # Unchanged rows are not rewritten, which also spares the indexes
+            result.unchanged += 1
+            continue
+        else:
+            result.updated += 1
+            changed.append(current.id)
+        rows.append({'question': question, 'answer': answer, 'created_at': now, 'updated_at': now})
+    if rows:
+        conn.execute(statement, rows)
+    if changed:
+        # Translated variants were made from the old answers
+        conn.execute(QATranslation.__table__.delete().where(QATranslation.__table__.c.qa_id.in_(changed)))
+        result.changed_ids.extend(changed)
+
+
+def import_qas(records, batch_size=BATCH_SIZE, clean=True):
+    """Upsert question/answer records keyed on ``QA.question``.
+
+    Records are validated like the admin form, deduplicated per batch (the
+    last one wins) and written one transaction per ``batch_size`` questions.
+    The full-text index triggers are suspended for the load and the index is
+    rebuilt once at the end.
+    """
+    result = ImportResult()
+    with db.engine.begin() as conn:
+        fts = has_qa_fts(conn)
+        if fts:
+            suspend_qa_fts(conn)
+    try:
+        batch = {}
+        with db.engine.connect() as conn:
+            statement = _upsert_statement(conn)
+            for number, record in enumerate(records, 1):
+                result.read += 1
+                try:
+                    question, answer = prepare(record, clean)
+                except ValueError as e:
+                    result.skip(number, e)
+                    continue
+                batch.pop(question, None)
+                batch[question] = answer
+                if len(batch) >= batch_size:
+                    with conn.begin():
+                        _write_batch(conn, statement, batch, result)
+                    batch = {}
+            if batch:
+                with conn.begin():
+                    _write_batch(conn, statement, batch, result)
+    finally:
+        if fts:
+            with db.engine.begin() as conn:
+                resume_qa_fts(conn, rebuild=bool(result.inserted or result.updated))
+    return result
+
+
+def _export_rows(conn, page_size=BATCH_SIZE):
+    table = QA.__table__
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            db.select([table.c.id, table.c.question, table.c.answer])
+            .where(table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(page_size)
+        ).fetchall()
+        if not rows:
+            return
+        for row in rows:
+            yield {'question': row.question, 'answer': row.answer}
+        last_id = rows[-1].id
+
+
+def export_qas(stream, fmt):
+    """Write every QA to ``stream`` in a format ``import_qas`` reads back; returns the count"""
+    count = 0
+    with db.engine.connect() as conn:
+        rows = _export_rows(conn)
+        if fmt == 'csv':
+            writer = csv.writer(stream)
+            writer.writerow(['question', 'answer'])
+            for row in rows:
+                writer.writerow([row['question'], row['answer']])
+                count += 1
+        elif fmt == 'ndjson':
+            for row in rows:
+                stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+                count += 1
+        else:
+            stream.write('[')
+            for row in rows:
+                stream.write((',\n    ' if count else '\n    ') + json.dumps(row, ensure_ascii=False))
+                count += 1
+            stream.write('\n]\n' if count else ']\n')
+    return count
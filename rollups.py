@@ -0,0 +1,254 @@
+import bisect
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from extensions import db
+from models import Conversation, ResponseFeedback, UsageRollup
+
+GRANULARITIES = ('hour', 'day')
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS = [0.1, 0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 30, 60]
+
+
+def bucket_start(timestamp, granularity):
+    if granularity == 'hour':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class _Delta:
+    """Changes to one rollup bucket accumulated from a batch of rows"""
+
+    def __init__(self):
+        self.requests = 0
+        self.latency_count = 0
+        self.latency_sum = 0.0
+        self.latency_min = None
+        self.latency_max = None
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.positive_feedback = 0
+        self.negative_feedback = 0
+        self.languages = defaultdict(int)
+        self.llm_requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def add_conversation(self, response_time, language, prompt_tokens=None, completion_tokens=None):
+        self.requests += 1
+        self.languages[language or 'en'] += 1
+        if prompt_tokens is not None or completion_tokens is not None:
+            self.llm_requests += 1
+            self.prompt_tokens += prompt_tokens or 0
+            self.completion_tokens += completion_tokens or 0
+        if response_time is None:
+            return
+        self.latency_count += 1
+        self.latency_sum += response_time
+        self.latency_min = response_time if self.latency_min is None else min(self.latency_min, response_time)
+        self.latency_max = response_time if self.latency_max is None else max(self.latency_max, response_time)
+        self.histogram[bisect.bisect_left(LATENCY_BUCKETS, response_time)] += 1
+
+    def add_feedback(self, is_positive):
+        if is_positive:
+            self.positive_feedback += 1
+        else:
+            self.negative_feedback += 1
+
+
+def _collect(conversations, feedbacks):
+    deltas = defaultdict(_Delta)
+    for row in conversations:
+        for granularity in GRANULARITIES:
+            key = (granularity, bucket_start(row['created_at'], granularity))
+            deltas[key].add_conversation(
+                row.get('response_time'), row.get('user_language'),
+                row.get('prompt_tokens'), row.get('completion_tokens'))
+    for row in feedbacks:
+        for granularity in GRANULARITIES:
+            key = (granularity, bucket_start(row['created_at'], granularity))
+            deltas[key].add_feedback(row['is_positive'])
+    return deltas
+
+
+def _merge(row, delta):
+    histogram = list(row.latency_histogram or [])
+    histogram += [0] * (len(delta.histogram) - len(histogram))
+    languages = dict(row.languages or {})
+    for language, count in delta.languages.items():
+        languages[language] = languages.get(language, 0) + count
+    mins = [value for value in (row.latency_min, delta.latency_min) if value is not None]
+    maxes = [value for value in (row.latency_max, delta.latency_max) if value is not None]
+    return {
+        'rollup_id': row.id,
+        'requests': row.requests + delta.requests,
+        'latency_count': row.latency_count + delta.latency_count,
+        'latency_sum': row.latency_sum + delta.latency_sum,
+        'latency_min': min(mins) if mins else None,
+        'latency_max': max(maxes) if maxes else None,
+        'latency_histogram': [a + b for a, b in zip(histogram, delta.histogram)],
+        'positive_feedback': row.positive_feedback + delta.positive_feedback,
+        'negative_feedback': row.negative_feedback + delta.negative_feedback,
+        'languages': languages,
+        'llm_requests': row.llm_requests + delta.llm_requests,
+        'prompt_tokens': row.prompt_tokens + delta.prompt_tokens,
+        'completion_tokens': row.completion_tokens + delta.completion_tokens
+    }
+
+
+def apply_rollups(conn, conversations, feedbacks):
+    """Fold a batch of new conversation and feedback rows into the rollup buckets.
+
+    Runs on the caller's connection and transaction. The empty buckets are
+    inserted first, so the transaction holds SQLite's write lock before the
+    buckets are read, and concurrent writers cannot lose each other's counts.
+    """
+    deltas = _collect(conversations, feedbacks)
+    if not deltas:
+        return
+    table = UsageRollup.__table__
+    conn.execute(table.insert().prefix_with('OR IGNORE'), [
+        {
+            'granularity': granularity,
+            'bucket_start': start,
+            'requests': 0,
+            'latency_count': 0,
+            'latency_sum': 0.0,
+            'positive_feedback': 0,
+            'negative_feedback': 0,
+            'llm_requests': 0,
+            'prompt_tokens': 0,
+            'completion_tokens': 0
+        }
+        for granularity, start in deltas
+    ])
+    updates = []
+    for granularity in GRANULARITIES:
+        starts = [start for g, start in deltas if g == granularity]
+        if not starts:
+            continue
+        rows = conn.execute(
+            db.select([table]).where(db.and_(table.c.granularity == granularity, table.c.bucket_start.in_(starts)))
+        ).fetchall()
+        for row in rows:
+            updates.append(_merge(row, deltas[(granularity, row.bucket_start)]))
+    conn.execute(
+        table.update().where(table.c.id == db.bindparam('rollup_id')).values(
+            {column: db.bindparam(column) for column in updates[0] if column != 'rollup_id'}
+        ),
+        updates
+    )
+
+
+def rebuild_rollups(chunk_size=5000):
+    """Recompute every bucket from the conversation and response_feedback tables"""
+    conversation = Conversation.__table__
+    feedback = ResponseFeedback.__table__
+    with db.engine.begin() as conn:
+        conn.execute(UsageRollup.__table__.delete())
+        conversations = 0
+        result = conn.execution_options(stream_results=True).execute(
+            db.select([conversation.c.created_at, conversation.c.response_time, conversation.c.user_language,
+                       conversation.c.prompt_tokens, conversation.c.completion_tokens])
+            .where(conversation.c.created_at.isnot(None))
+        )
+        while True:
+            rows = [dict(row._mapping) for row in result.fetchmany(chunk_size)]
+            if not rows:
+                break
+            apply_rollups(conn, rows, [])
+            conversations += len(rows)
+        feedbacks = 0
+        result = conn.execution_options(stream_results=True).execute(
+            db.select([feedback.c.created_at, feedback.c.is_positive])
+            .where(feedback.c.created_at.isnot(None))
+        )
+        while True:
+            rows = [dict(row._mapping) for row in result.fetchmany(chunk_size)]
+            if not rows:
+                break
+            apply_rollups(conn, [], rows)
+            feedbacks += len(rows)
+    return conversations, feedbacks
+
+
+def load_rollups(granularity, since=None):
+    query = UsageRollup.query.filter_by(granularity=granularity)
+    if since is not None:
+        query = query.filter(UsageRollup.bucket_start >= bucket_start(since, granularity))
+    return query.order_by(UsageRollup.bucket_start).all()
+
+
+def latency_percentile(histogram, quantile, latency_min=None, latency_max=None):
+    """Estimate a latency quantile by interpolating inside the histogram bucket"""
+    total = sum(histogram)
+    if not total:
+        return 0.0
+    target = quantile * total
+    seen = 0
+    for i, count in enumerate(histogram):
+        if count and seen + count >= target:
+            lower = LATENCY_BUCKETS[i - 1] if i > 0 else 0.0
+            upper = LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else (latency_max or lower)
+            if latency_min is not None:
+                lower = max(lower, min(latency_min, upper))
+            if latency_max is not None:
+                upper = min(upper, latency_max)
+            return lower + (upper - lower) * (target - seen) / count
+        seen += count
+    return latency_max or 0.0
+
+
+def summarize(rollups):
+    """Totals, latency statistics and percentiles over a list of buckets"""
+    histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+    languages = defaultdict(int)
+    requests = latency_count = positive = negative = 0
+    llm_requests = prompt_tokens = completion_tokens = 0
+    latency_sum = 0.0
+    mins, maxes = [], []
+    for rollup in rollups:
+        requests += rollup.requests
+        latency_count += rollup.latency_count
+        latency_sum += rollup.latency_sum
+        positive += rollup.positive_feedback
+        negative += rollup.negative_feedback
+        llm_requests += rollup.llm_requests
+        prompt_tokens += rollup.prompt_tokens
+        completion_tokens += rollup.completion_tokens
+        if rollup.latency_min is not None:
+            mins.append(rollup.latency_min)
+        if rollup.latency_max is not None:
+            maxes.append(rollup.latency_max)
+        for i, count in enumerate(rollup.latency_histogram or []):
+            histogram[i] += count
+        for language, count in (rollup.languages or {}).items():
+            languages[language] += count
+    latency_min = min(mins) if mins else 0.0
+    latency_max = max(maxes) if maxes else 0.0
+    return {
+        'requests': requests,
+        'latency_count': latency_count,
+        'latency_average': latency_sum / latency_count if latency_count else 0.0,
+        'latency_min': latency_min,
+        'latency_max': latency_max,
+        'latency_p50': latency_percentile(histogram, 0.50, latency_min, latency_max),
+        'latency_p95': latency_percentile(histogram, 0.95, latency_min, latency_max),
+        'latency_p99': latency_percentile(histogram, 0.99, latency_min, latency_max),
+        'positive_feedback': positive,
+        'negative_feedback': negative,
+        'languages': dict(languages),
+        'llm_requests': llm_requests,
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens
+    }
+
+
+def daily_counts(rollups, days, today=None):
+    """Request counts for the last ``days`` days, oldest first, including empty days"""
+    today = today or datetime.utcnow().date()
+    counts = {rollup.bucket_start.date(): rollup.requests for rollup in rollups}
+    return [
+        {'date': day.strftime('%Y-%m-%d'), 'count': counts.get(day, 0)}
+        for day in (today - timedelta(days=i) for i in reversed(range(days)))
+    ]
@@ -0,0 +1,276 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from qa_index import normalize_question, tokenize
+
+# Bumped whenever the vectors change, so old snapshots are not mixed with new ones
+VECTOR_VERSION = 3
+
+# Share of the query's words a match must contain, allowing for typos
+MIN_TOKEN_OVERLAP = 0.66
+
+
+def _trigrams(token):
+    padded = f"<{token}>"
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def question_hash(question):
+    """Signed 64-bit digest of a question's text, stored with its vector"""
+    digest = hashlib.blake2b(question.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little', signed=True)
+
+
+def token_overlap(query_tokens, tokens):
+    """Share of ``query_tokens`` found in ``tokens``, a misspelling counting as found"""
+    if not query_tokens:
+        return 0.0
+    found = 0
+    for query_token in query_tokens:
+        if query_token in tokens:
+            found += 1
+            continue
+        grams = set(_trigrams(query_token))
+        for token in tokens:
+            other = set(_trigrams(token))
+            if len(grams & other) * 2 >= len(grams | other):
+                found += 1
+                break
+    return found / len(query_tokens)
+
+
+class HashingVectorizer:
+    """Stateless bag-of-words embedding using the hashing trick.
+
+    Each meaningful word and each of its character trigrams is hashed into a fixed
+    number of buckets, so no vocabulary has to be fitted and every worker produces
+    identical vectors for the same text. A word's trigrams split ``ngram_weight``
+    between them, so a long word carries no more weight than a short one.
+    """
+
+    def __init__(self, dim=512, ngram_weight=1.5):
+        self.dim = dim
+        self.ngram_weight = ngram_weight
+
+    def _features(self, text):
+        for token in tokenize(normalize_question(text)):
+            yield token, 1.0
+            grams = _trigrams(token)
+            weight = self.ngram_weight / np.sqrt(len(grams))
+            for gram in grams:
+                yield '#' + gram, weight
+
+    def transform(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, weight in self._features(text):
+            h = zlib.crc32(feature.encode('utf-8'))
+            vector[h % self.dim] += weight if h & 0x80000000 else -weight
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+
+class SemanticCache:
+    """Nearest-neighbour lookup of stored questions by cosine similarity.
+
+    Vectors live in one contiguous float32 matrix whose rows map to QA ids, so a
+    lookup is a single matrix-vector product. The matrix is snapshotted, with
+    each row's QA id and question hash, to a single .npy file that is
+    memory-mapped on load, letting new workers start without re-embedding the
+    whole knowledge base. A row is only reused while its question is unchanged.
+    """
+
+    def __init__(self, path, threshold=0.75, dim=512, save_interval=30):
+        root, extension = os.path.splitext(path)
+        self.path = f"{root}.v{VECTOR_VERSION}{extension}"
+        self.threshold = threshold
+        self.vectorizer = HashingVectorizer(dim=dim)
+        self.save_interval = save_interval
+        self.loaded = False
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+        self._matrix = np.zeros((0, dim), dtype=np.float32)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._hashes = np.zeros(0, dtype=np.int64)
+        self._size = 0
+        self._rows = {}
+        self._tokens = {}
+        self._dirty = False
+        self._last_save = time.time()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _snapshot_dtype(self):
+        return np.dtype([('id', np.int64), ('hash', np.int64), ('vector', np.float32, (self.vectorizer.dim,))])
+
+    def _read_snapshot(self):
+        if not os.path.exists(self.path):
+            return None
+        try:
+            snapshot = np.load(self.path, mmap_mode='r')
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable semantic cache snapshot: {e}")
+            return None
+        if snapshot.ndim != 1 or snapshot.dtype != self._snapshot_dtype():
+            logging.warning("Ignoring semantic cache snapshot with mismatched layout")
+            return None
+        return snapshot
+
+    def load(self, rows):
+        """Load the snapshot and reconcile it with the current (qa_id, question) rows.
+
+        Snapshot rows are reused only for live ids whose question text is
+        unchanged; everything else is embedded afresh, and rows for deleted
+        questions are dropped.
+        """
+        rows = [(qa_id, question, question_hash(question)) for qa_id, question in rows]
+        with self._lock:
+            snapshot = self._read_snapshot()
+            known = {}
+            if snapshot is not None:
+                keys = zip(snapshot['id'].tolist(), snapshot['hash'].tolist())
+                known = {key: row for row, key in enumerate(keys)}
+
+            reused = [(qa_id, digest) for qa_id, _, digest in rows if (qa_id, digest) in known]
+            missing = [(qa_id, question) for qa_id, question, digest in rows if (qa_id, digest) not in known]
+
+            self._matrix = np.zeros((max(len(rows), 16), self.vectorizer.dim), dtype=np.float32)
+            self._ids = np.zeros(self._matrix.shape[0], dtype=np.int64)
+            self._hashes = np.zeros(self._matrix.shape[0], dtype=np.int64)
+            self._size = 0
+            self._rows = {}
+            if reused:
+                source_rows = [known[key] for key in reused]
+                self._matrix[:len(reused)] = snapshot['vector'][source_rows]
+                self._ids[:len(reused)] = [qa_id for qa_id, _ in reused]
+                self._hashes[:len(reused)] = [digest for _, digest in reused]
+                self._rows = {qa_id: row for row, (qa_id, _) in enumerate(reused)}
+                self._size = len(reused)
+            for qa_id, question in missing:
+                self._append(qa_id, self.vectorizer.transform(question), question_hash(question))
+
+            self._tokens = {qa_id: frozenset(tokenize(question)) for qa_id, question, _ in rows}
+            self._dirty = bool(missing) or len(reused) != len(known)
+            self.loaded = True
+            logging.info(f"Semantic cache loaded: {len(reused)} rows from snapshot, {len(missing)} embedded")
+        self.save_if_due(force=True)
+
+    def _append(self, qa_id, vector, digest):
+        if self._size == self._matrix.shape[0]:
+            capacity = max(16, self._matrix.shape[0] * 2)
+            matrix = np.zeros((capacity, self.vectorizer.dim), dtype=np.float32)
+            matrix[:self._size] = self._matrix[:self._size]
+            ids = np.zeros(capacity, dtype=np.int64)
+            ids[:self._size] = self._ids[:self._size]
+            hashes = np.zeros(capacity, dtype=np.int64)
+            hashes[:self._size] = self._hashes[:self._size]
+            self._matrix, self._ids, self._hashes = matrix, ids, hashes
+        self._matrix[self._size] = vector
+        self._ids[self._size] = qa_id
+        self._hashes[self._size] = digest
+        self._rows[qa_id] = self._size
+        self._size += 1
+
+    def add(self, qa_id, question):
+        vector = self.vectorizer.transform(question)
+        digest = question_hash(question)
+        with self._lock:
+            row = self._rows.get(qa_id)
+            if row is None:
+                self._append(qa_id, vector, digest)
+            else:
+                self._matrix[row] = vector
+                self._hashes[row] = digest
+            self._tokens[qa_id] = frozenset(tokenize(question))
+            self._dirty = True
+        self.save_if_due()
+
+    def remove(self, qa_id):
+        with self._lock:
+            row = self._rows.pop(qa_id, None)
+            self._tokens.pop(qa_id, None)
+            if row is None:
+                return
+            # Leave a zero row behind; compacted on the next save
+            self._matrix[row] = 0.0
+            self._ids[row] = -1
+            self._dirty = True
+        self.save_if_due()
+
+    def search(self, query, k=3):
+        """Return up to ``k`` (qa_id, cosine similarity) pairs, best first"""
+        vector = self.vectorizer.transform(query)
+        with self._lock:
+            if not self._rows or not vector.any():
+                return []
+            scores = self._matrix[:self._size] @ vector
+            k = min(k, self._size)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(int(self._ids[row]), float(scores[row])) for row in top if self._ids[row] >= 0]
+
+    def best_match(self, query, threshold=None):
+        """The closest question above ``threshold`` that also shares most of the query's words"""
+        threshold = self.threshold if threshold is None else threshold
+        query_tokens = set(tokenize(query))
+        for qa_id, score in self.search(query):
+            if score < threshold:
+                break
+            if token_overlap(query_tokens, self._tokens.get(qa_id, ())) >= MIN_TOKEN_OVERLAP:
+                self.hits += 1
+                return qa_id
+        self.misses += 1
+        return None
+
+    def save_if_due(self, force=False):
+        with self._lock:
+            if not self._dirty:
+                return
+            if not force and time.time() - self._last_save < self.save_interval:
+                return
+            self._save()
+
+    def _save(self):
+        # Only this worker's rows are written: merging in rows from the file
+        # would bring back questions deleted since it was saved. Rows another
+        # worker added are embedded again by whoever loads next.
+        live = [row for row in range(self._size) if self._ids[row] >= 0]
+        snapshot = np.zeros(len(live), dtype=self._snapshot_dtype())
+        snapshot['id'] = self._ids[live]
+        snapshot['hash'] = self._hashes[live]
+        snapshot['vector'] = self._matrix[live]
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Ids, hashes and vectors are replaced together, so readers never see
+        # a mismatched pair
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, 'wb') as f:
+                np.save(f, snapshot)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logging.error(f"Failed to save semantic cache snapshot: {e}")
+            return
+        self._dirty = False
+        self._last_save = time.time()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self._rows),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            'threshold': self.threshold
+        }
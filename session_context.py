@@ -0,0 +1,84 @@
+import re
+
+from cache import make_key
+from prompts import estimate_tokens, truncate
+
+RESOURCES_HEADER = re.compile(r'^\W*helpful resources\b', re.IGNORECASE | re.MULTILINE)
+URL = re.compile(r'https?://\S+')
+
+# A truncated turn shorter than this is not worth including
+MIN_TURN_TOKENS = 24
+
+
+def strip_boilerplate(answer):
+    """An answer without the parts every answer repeats.
+
+    Drops the "Helpful Resources" section and any line carrying a link, which
+    also catches the links in answers translated into another language.
+    """
+    match = RESOURCES_HEADER.search(answer)
+    if match:
+        answer = answer[:match.start()]
+    lines = [line.strip() for line in answer.split('\n') if not URL.search(line)]
+    lines = [line for line in lines if line]
+    if lines and lines[-1].endswith(':'):
+        # The heading of a translated resources list whose links were removed
+        lines.pop()
+    return '\n'.join(lines)
+
+
+class SessionContextStore:
+    """The last few turns of each chat session, kept in a cache of their own.
+
+    Turns are appended as answers are produced, already stripped of
+    boilerplate, so building prompt context needs no database query. Each
+    session is one cache entry holding at most ``max_turns`` turns and expires
+    ``ttl`` seconds after its last turn. With a shared CACHE_BACKEND the
+    context follows a session across workers. Reads use ``peek`` so they do
+    not count as cache lookups.
+    """
+
+    def __init__(self, cache, max_turns=3, ttl=1800):
+        self.cache = cache
+        self.max_turns = max_turns
+        self.ttl = ttl
+
+    def _key(self, session_id):
+        return make_key('session_context', session_id)
+
+    def turns(self, session_id):
+        """(user message, bot response) pairs, oldest first"""
+        return self.cache.peek(self._key(session_id)) or []
+
+    def append(self, session_id, user_message, bot_response):
+        if not session_id or self.max_turns <= 0:
+            return
+        turns = self.turns(session_id) + [(user_message, strip_boilerplate(bot_response))]
+        self.cache.set(self._key(session_id), turns[-self.max_turns:], ttl=self.ttl)
+
+    def context_messages(self, session_id, max_tokens):
+        """Prompt lines for the most recent turns that fit in ``max_tokens``.
+
+        Newer turns are kept whole first; the oldest turn that does not fit is
+        truncated if enough budget is left, and anything older is dropped.
+        """
+        selected = []
+        remaining = max_tokens
+        for user_message, bot_response in reversed(self.turns(session_id)):
+            user_line = f"User: {user_message}"
+            bot_line = f"Bot: {bot_response}"
+            cost = estimate_tokens(user_line) + estimate_tokens(bot_line)
+            if cost <= remaining:
+                selected.append((user_line, bot_line))
+                remaining -= cost
+                continue
+            if remaining >= MIN_TURN_TOKENS:
+                user_line = truncate(user_line, remaining // 2)
+                bot_line = truncate(bot_line, remaining - estimate_tokens(user_line))
+                selected.append((user_line, bot_line))
+            break
+        messages = []
+        for user_line, bot_line in reversed(selected):
+            messages.append(user_line)
+            messages.append(bot_line)
+        return messages
@@ -0,0 +1,219 @@
+import logging
+import re
+import shutil
+import struct
+import subprocess
+import threading
+import time
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+|\n+')
+
+
+def split_sentences(text):
+    return [sentence.strip() for sentence in SENTENCE_BOUNDARY.split(text) if sentence.strip()]
+
+
+class SpeechBackend:
+    """Turns text into audio chunks.
+
+    ``synthesize`` yields bytes as soon as each piece of the answer is ready,
+    so the first sentence can be sent while the rest is still being spoken.
+    """
+
+    name = None
+    mimetype = None
+    extension = None
+
+    def supports(self, lang):
+        raise NotImplementedError
+
+    def synthesize(self, text, lang):
+        raise NotImplementedError
+
+
+class GTTSBackend(SpeechBackend):
+    """Google Translate's speech endpoint; one HTTPS request per ~100 characters"""
+
+    name = 'gtts'
+    mimetype = 'audio/mpeg'
+    extension = 'mp3'
+
+    def __init__(self):
+        self._languages = None
+
+    def supports(self, lang):
+        if self._languages is None:
+            # Imported on first use; gtts is slow to import and only needed for speech
+            from gtts.lang import tts_langs
+            self._languages = frozenset(tts_langs())
+        return lang in self._languages
+
+    def synthesize(self, text, lang):
+        from gtts import gTTS
+        # gTTS already splits on sentence boundaries and yields each part's MP3
+        # frames as soon as that request returns
+        return gTTS(text=text, lang=lang).stream()
+
+
+class EspeakBackend(SpeechBackend):
+    """Local espeak-ng subprocess; no network round trip.
+
+    Each sentence is spoken by its own espeak-ng call. The first call's WAV
+    header is re-emitted with open-ended sizes and every sentence contributes
+    only its PCM samples, so the result is a single playable WAV stream.
+    """
+
+    name = 'espeak'
+    mimetype = 'audio/wav'
+    extension = 'wav'
+
+    def __init__(self, executable='espeak-ng', speed=None, timeout=30):
+        self.executable = shutil.which(executable) or executable
+        self.speed = speed
+        self.timeout = timeout
+        self._languages = None
+        self._lock = threading.Lock()
+
+    def languages(self):
+        if self._languages is None:
+            with self._lock:
+                if self._languages is None:
+                    self._languages = self._list_languages()
+        return self._languages
+
+    def _list_languages(self):
+        try:
+            output = subprocess.run(
+                [self.executable, '--voices'], capture_output=True, text=True, timeout=self.timeout, check=True
+            ).stdout
+        except (OSError, subprocess.SubprocessError) as e:
+            logging.error(f"espeak-ng is not available: {e}")
+            return frozenset()
+        languages = set()
+        # Columns: Pty Language Age/Gender VoiceName File Other Languages
+        for line in output.splitlines()[1:]:
+            fields = line.split()
+            if len(fields) >= 2:
+                languages.add(fields[1])
+                languages.add(fields[1].split('-')[0])
+        return frozenset(languages)
+
+    def supports(self, lang):
+        return lang in self.languages()
+
+    def _speak(self, sentence, lang):
+        command = [self.executable, '-v', lang, '--stdout']
+        if self.speed:
+            command += ['-s', str(self.speed)]
+        return subprocess.run(
+            command, input=sentence.encode('utf-8'), capture_output=True, timeout=self.timeout, check=True
+        ).stdout
+
+    def synthesize(self, text, lang):
+        header_sent = False
+        for sentence in split_sentences(text):
+            header, samples = split_wav(self._speak(sentence, lang))
+            if not header_sent:
+                yield streaming_wav_header(header)
+                header_sent = True
+            yield samples
+
+
+def split_wav(data):
+    """Split a RIFF/WAVE file into its header (up to the data chunk) and samples"""
+    if data[:4] != b'RIFF' or data[8:12] != b'WAVE':
+        raise ValueError('Not a WAV file')
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id = data[offset:offset + 4]
+        chunk_size = struct.unpack('<I', data[offset + 4:offset + 8])[0]
+        if chunk_id == b'data':
+            start = offset + 8
+            # Streaming writers leave the size unset; take whatever follows
+            end = min(start + chunk_size, len(data))
+            return data[:start], data[start:end]
+        offset += 8 + chunk_size + (chunk_size & 1)
+    raise ValueError('WAV file has no data chunk')
+
+
+def streaming_wav_header(header):
+    """The same header with RIFF and data sizes marked unknown (0xFFFFFFFF)"""
+    unknown = struct.pack('<I', 0xFFFFFFFF)
+    return header[:4] + unknown + header[8:-4] + unknown
+
+
+class BackendMetrics:
+    """Latency of one speech backend: time to first chunk and to the last one"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.first_chunk_total = 0.0
+        self.first_chunk_max = 0.0
+        self.complete_total = 0.0
+        self.completed = 0
+        self._lock = threading.Lock()
+
+    def timed(self, chunks):
+        start = time.perf_counter()
+        first = True
+        with self._lock:
+            self.requests += 1
+        try:
+            for chunk in chunks:
+                if first:
+                    elapsed = time.perf_counter() - start
+                    with self._lock:
+                        self.first_chunk_total += elapsed
+                        self.first_chunk_max = max(self.first_chunk_max, elapsed)
+                    first = False
+                yield chunk
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        with self._lock:
+            self.completed += 1
+            self.complete_total += time.perf_counter() - start
+
+    def stats(self):
+        started = self.requests - self.errors
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'first_chunk_avg_ms': round(self.first_chunk_total / started * 1000, 1) if started else 0.0,
+            'first_chunk_max_ms': round(self.first_chunk_max * 1000, 1),
+            'complete_avg_ms': round(self.complete_total / self.completed * 1000, 1) if self.completed else 0.0
+        }
+
+
+class SpeechService:
+    """Backends in order of preference; each language goes to the first that speaks it"""
+
+    def __init__(self, backends):
+        self.backends = backends
+        self.metrics = {backend.name: BackendMetrics() for backend in backends}
+
+    def backend_for(self, lang):
+        for backend in self.backends:
+            if backend.supports(lang):
+                return backend
+        return None
+
+    def synthesize(self, backend, text, lang):
+        return self.metrics[backend.name].timed(backend.synthesize(text, lang))
+
+    def stats(self):
+        return {name: metrics.stats() for name, metrics in self.metrics.items()}
+
+
+def build_speech_service(names, espeak_path='espeak-ng', espeak_speed=None):
+    backends = []
+    for name in names:
+        if name == 'gtts':
+            backends.append(GTTSBackend())
+        elif name == 'espeak':
+            backends.append(EspeakBackend(espeak_path, speed=espeak_speed))
+        else:
+            raise ValueError(f"Unknown speech backend: {name}")
+    return SpeechService(backends)
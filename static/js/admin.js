@@ -0,0 +1,134 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const table = document.querySelector('[data-qa-table]');
+    if (!table) {
+        return;
+    }
+
+    const tbody = table.querySelector('tbody');
+    const rowTemplate = document.querySelector('.qa-row-template');
+    const searchInput = document.querySelector('.qa-search');
+    const loadMoreBtn = document.querySelector('.qa-load-more');
+    const emptyMessage = document.querySelector('.qa-empty');
+    const defaultSort = table.dataset.sort;
+    const defaultDirection = table.dataset.direction;
+
+    let sort = defaultSort;
+    let direction = defaultDirection;
+    let sortChosen = false;
+    let nextCursor = null;
+    let requestId = 0;
+    let searchTimer = null;
+
+    function formatValue(value, format) {
+        if (format === 'preview') {
+            return value.length > 100 ? value.slice(0, 100) + '...' : value;
+        }
+        if (format === 'score') {
+            return Number(value).toFixed(2);
+        }
+        return value;
+    }
+
+    function renderRow(item) {
+        const row = rowTemplate.content.firstElementChild.cloneNode(true);
+        row.querySelectorAll('[data-field]').forEach(function(cell) {
+            cell.textContent = formatValue(item[cell.dataset.field], cell.dataset.format);
+        });
+        row.querySelectorAll('[data-width]').forEach(function(bar) {
+            bar.style.width = Math.round(item[bar.dataset.width] * 100) + '%';
+        });
+        // URLs are rendered for id 0 and pointed at this row's QA
+        row.querySelectorAll('a[data-url]').forEach(function(link) {
+            link.href = link.dataset.url.replace(/0$/, item.id);
+        });
+        row.querySelectorAll('form[data-url]').forEach(function(form) {
+            form.action = form.dataset.url.replace(/0$/, item.id);
+        });
+        return row;
+    }
+
+    function updateSortIndicators() {
+        table.querySelectorAll('th[data-sort]').forEach(function(th) {
+            th.classList.remove('sorted-asc', 'sorted-desc');
+            if (th.dataset.sort === sort) {
+                th.classList.add(direction === 'asc' ? 'sorted-asc' : 'sorted-desc');
+            }
+        });
+    }
+
+    async function loadPage(reset) {
+        const currentRequest = ++requestId;
+        const params = new URLSearchParams({ sort: sort, direction: direction, limit: 50 });
+        const query = searchInput ? searchInput.value.trim() : '';
+        if (query) {
+            params.set('q', query);
+        }
+        if (!reset && nextCursor) {
+            params.set('cursor', nextCursor);
+        }
+
+        loadMoreBtn.disabled = true;
+        try {
+            const response = await fetch(table.dataset.apiUrl + '?' + params.toString());
+            const data = await response.json();
+            // A newer search or sort superseded this request
+            if (currentRequest !== requestId) {
+                return;
+            }
+            if (!response.ok) {
+                throw new Error(data.error || 'Failed to load Q&A entries');
+            }
+            if (reset) {
+                tbody.innerHTML = '';
+            }
+            const fragment = document.createDocumentFragment();
+            data.items.forEach(function(item) {
+                fragment.appendChild(renderRow(item));
+            });
+            tbody.appendChild(fragment);
+            nextCursor = data.next_cursor;
+            loadMoreBtn.classList.toggle('hidden', !nextCursor);
+            emptyMessage.classList.toggle('hidden', tbody.children.length > 0);
+        } catch (error) {
+            console.error('Error loading Q&A entries:', error);
+        } finally {
+            loadMoreBtn.disabled = false;
+        }
+    }
+
+    table.querySelectorAll('th[data-sort]').forEach(function(th) {
+        th.addEventListener('click', function() {
+            if (sort === th.dataset.sort) {
+                direction = direction === 'asc' ? 'desc' : 'asc';
+            } else {
+                sort = th.dataset.sort;
+                direction = sort === 'question' ? 'asc' : 'desc';
+            }
+            sortChosen = true;
+            updateSortIndicators();
+            loadPage(true);
+        });
+    });
+
+    if (searchInput) {
+        searchInput.addEventListener('input', function() {
+            clearTimeout(searchTimer);
+            searchTimer = setTimeout(function() {
+                // Searches are ranked by relevance unless a column was picked
+                if (!sortChosen) {
+                    sort = searchInput.value.trim() ? 'relevance' : defaultSort;
+                    direction = searchInput.value.trim() ? 'asc' : defaultDirection;
+                    updateSortIndicators();
+                }
+                loadPage(true);
+            }, 250);
+        });
+    }
+
+    loadMoreBtn.addEventListener('click', function() {
+        loadPage(false);
+    });
+
+    updateSortIndicators();
+    loadPage(true);
+});
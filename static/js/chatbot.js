@@ -319,20 +319,45 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     // Enhanced text-to-speech handling
-    function speakText(text) {
+    // Longer texts may exceed proxies' URL limits; those are posted and
+    // played once downloaded
+    const MAX_TTS_URL_LENGTH = 8000;
+
+    function speakText(text, lang = 'en') {
         if (!('speechSynthesis' in window)) {
             addMessage('Text-to-speech is not supported in this browser.', 'error');
             return;
         }
 
         // Try server-side TTS first, fallback to browser TTS
+        const url = '/text_to_speech?' + new URLSearchParams({ text: text, lang: lang });
+        if (url.length > MAX_TTS_URL_LENGTH) {
+            downloadSpeech(text, lang);
+            return;
+        }
+
+        // The <audio> element plays the streamed response as it arrives
+        // instead of waiting for the whole file
+        const audio = new Audio(url);
+        let failed = false;
+        const fallBack = () => {
+            if (failed) return;
+            failed = true;
+            speakWithBrowser(text, lang);
+        };
+        audio.addEventListener('error', fallBack);
+        audio.play().catch(fallBack);
+    }
+
+    function downloadSpeech(text, lang) {
         fetch('/text_to_speech', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
             body: JSON.stringify({
-                text: text
+                text: text,
+                lang: lang
             })
         })
         .then(response => {
@@ -344,19 +369,20 @@ document.addEventListener('DOMContentLoaded', function() {
         })
         .then(blob => {
             const audio = new Audio(URL.createObjectURL(blob));
-            audio.play();
+            return audio.play();
         })
-        .catch(error => {
-            console.log('Falling back to browser TTS');
-            // Fallback to browser TTS
-            window.speechSynthesis.cancel();
-            const cleanText = text.replace(/-/g, '').replace(/\n/g, ' ');
-            const utterance = new SpeechSynthesisUtterance(cleanText);
-            utterance.lang = 'en-US';
-            utterance.rate = 1;
-            utterance.pitch = 1;
-            window.speechSynthesis.speak(utterance);
-        });
+        .catch(error => speakWithBrowser(text, lang));
+    }
+
+    function speakWithBrowser(text, lang) {
+        console.log('Falling back to browser TTS');
+        window.speechSynthesis.cancel();
+        const cleanText = text.replace(/-/g, '').replace(/\n/g, ' ');
+        const utterance = new SpeechSynthesisUtterance(cleanText);
+        utterance.lang = lang === 'en' ? 'en-US' : lang;
+        utterance.rate = 1;
+        utterance.pitch = 1;
+        window.speechSynthesis.speak(utterance);
     }
 
     ttsButton.addEventListener('click', () => {
@@ -392,20 +418,17 @@ document.addEventListener('DOMContentLoaded', function() {
             formData.append('message', message);
             formData.append('session_id', sessionId);
 
-            const response = await fetch('/get_response', {
-                method: 'POST',
-                body: formData
-            });
+            const data = window.ReadableStream && window.TextDecoder
+                ? await streamResponse(formData, typingDiv)
+                : await fetchResponse(formData);
 
-            // Remove typing indicator
+            // Remove typing indicator / partial answer
             typingDiv.remove();
-
-            const data = await response.json();
             
-            if (data.answer) {
+            if (data && data.answer) {
                 addMessage(data.answer, 'bot', data.responseId, data.responseLang);
                 if (isVoiceEnabled) {
-                    speakText(data.answer);
+                    speakText(data.answer, data.responseLang);
                 }
             } else {
                 addMessage('Sorry, I encountered an error. Please try again.', 'error');
@@ -417,6 +440,67 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
 
+    async function fetchResponse(formData) {
+        const response = await fetch('/get_response', {
+            method: 'POST',
+            body: formData
+        });
+        return response.json();
+    }
+
+    // Read Server-Sent Events from /get_response_stream, rendering answer text
+    // into the typing bubble as it arrives. Resolves with the final payload.
+    async function streamResponse(formData, typingDiv) {
+        const response = await fetch('/get_response_stream', {
+            method: 'POST',
+            body: formData
+        });
+        if (!response.ok || !response.body) {
+            throw new Error('Streaming request failed');
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        const bubble = typingDiv.querySelector('.message-content');
+        let buffer = '';
+        let streamedText = '';
+        let result = null;
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let eventName = 'message';
+                let data = '';
+                rawEvent.split('\n').forEach(line => {
+                    if (line.startsWith('event:')) eventName = line.slice(6).trim();
+                    else if (line.startsWith('data:')) data += line.slice(5).trim();
+                });
+                if (!data) continue;
+
+                const payload = JSON.parse(data);
+                if (eventName === 'chunk') {
+                    if (!streamedText) {
+                        typingDiv.classList.remove('typing');
+                        bubble.classList.add('streaming');
+                    }
+                    streamedText += payload.text;
+                    bubble.textContent = streamedText;
+                    messagesContainer.scrollTop = messagesContainer.scrollHeight;
+                } else if (eventName === 'done') {
+                    result = payload;
+                }
+            }
+        }
+        return result;
+    }
+
     // Settings button functionality
     settingsButton.addEventListener('click', () => {
         const settings = {
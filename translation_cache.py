@@ -0,0 +1,132 @@
+import hashlib
+import logging
+import threading
+
+from cache import TTLCache
+from extensions import db
+from models import TranslationMemory
+
+# Google Translate v2 accepts at most 128 segments per request
+MAX_BATCH_SEGMENTS = 100
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class TranslationCache:
+    """Translation memory: in-memory LRU over the translation_memory table.
+
+    ``translate_many`` is called with a list of segments and a target language
+    and must return the translated segments in order; every miss in one
+    ``translate_batch`` call is sent in a single round trip.
+
+    Reads and writes use their own connection, so translating in the middle of
+    a request never commits the request's session.
+    """
+
+    def __init__(self, translate_many, max_entries=5000):
+        self.translate_many = translate_many
+        self.memory = TTLCache(max_entries=max_entries, default_ttl=0)
+        self.upstream_calls = 0
+        self.upstream_segments = 0
+
+    def translate(self, text, target_language):
+        return self.translate_batch([text], target_language)[0]
+
+    def translate_batch(self, texts, target_language):
+        results = [None] * len(texts)
+        missing = {}
+        for i, text in enumerate(texts):
+            if not text:
+                results[i] = text
+                continue
+            cached = self.memory.get((text_hash(text), target_language))
+            if cached is not None:
+                results[i] = cached
+            else:
+                missing.setdefault(text, []).append(i)
+
+        if missing:
+            stored = self._load(list(missing), target_language)
+            for text, translated in stored.items():
+                for i in missing.pop(text):
+                    results[i] = translated
+
+        if missing:
+            fresh = self._translate_upstream(list(missing), target_language)
+            self._store(fresh, target_language)
+            for text, translated in fresh.items():
+                for i in missing[text]:
+                    results[i] = translated
+        return results
+
+    def _translate_upstream(self, texts, target_language):
+        translated = {}
+        for start in range(0, len(texts), MAX_BATCH_SEGMENTS):
+            segment = texts[start:start + MAX_BATCH_SEGMENTS]
+            self.upstream_calls += 1
+            self.upstream_segments += len(segment)
+            translated.update(zip(segment, self.translate_many(segment, target_language)))
+        return translated
+
+    def _load(self, texts, target_language):
+        hashes = {text_hash(text): text for text in texts}
+        table = TranslationMemory.__table__
+        with db.engine.connect() as conn:
+            rows = conn.execute(
+                db.select([table.c.text_hash, table.c.translated_text]).where(
+                    db.and_(table.c.target_lang == target_language, table.c.text_hash.in_(list(hashes)))
+                )
+            ).fetchall()
+        found = {}
+        for row in rows:
+            text = hashes[row.text_hash]
+            found[text] = row.translated_text
+            self.memory.set((row.text_hash, target_language), row.translated_text)
+        return found
+
+    def _store(self, translations, target_language):
+        rows = []
+        for text, translated in translations.items():
+            digest = text_hash(text)
+            self.memory.set((digest, target_language), translated)
+            rows.append({
+                'text_hash': digest,
+                'target_lang': target_language,
+                'source_text': text,
+                'translated_text': translated
+            })
+        if not rows:
+            return
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(TranslationMemory.__table__.insert().prefix_with('OR IGNORE'), rows)
+        except Exception as e:
+            logging.error(f"Failed to store translations: {e}")
+
+    def prewarm(self, texts, languages):
+        """Make sure the static strings are translated into each language"""
+        for language in languages:
+            try:
+                self.translate_batch(texts, language)
+            except Exception as e:
+                logging.error(f"Translation prewarm for '{language}' failed: {e}")
+
+    def prewarm_in_background(self, app, texts, languages):
+        def run():
+            with app.app_context():
+                self.prewarm(texts, languages)
+            logging.info(f"Translation memory prewarmed for {', '.join(languages)}")
+        thread = threading.Thread(target=run, name='translation-prewarm', daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self):
+        memory = self.memory.stats()
+        return {
+            'memory_size': memory['size'],
+            'memory_hit_rate': memory['hit_rate'],
+            'upstream_calls': self.upstream_calls,
+            'upstream_segments': self.upstream_segments
+        }
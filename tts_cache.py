@@ -0,0 +1,125 @@
+import hashlib
+import logging
+import os
+import threading
+import uuid
+
+
+def audio_key(text, lang, backend='gtts'):
+    return hashlib.sha256(f'{backend}\0{lang}\0{text}'.encode('utf-8')).hexdigest()
+
+
+class AudioCache:
+    """Content-addressed audio files on local disk, evicted least recently used first.
+
+    Files are named by the hash of (backend, lang, text), so the same answer is
+    only ever synthesized once and its name doubles as an ETag. ``max_bytes``
+    bounds the total size of the directory; hits refresh a file's mtime so
+    eviction drops the least recently played audio.
+    """
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._size = None
+        self._lock = threading.Lock()
+
+    def path(self, key, extension='mp3'):
+        return os.path.join(self.directory, key[:2], f'{key}.{extension}')
+
+    def get(self, key, extension='mp3'):
+        """Path of the cached audio, or None"""
+        path = self.path(key, extension)
+        try:
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def write_through(self, key, chunks, extension='mp3'):
+        """Yield ``chunks`` while writing them to the cache.
+
+        The file only becomes visible once the whole stream was written, so an
+        aborted synthesis or a client that disconnects never leaves a truncated
+        entry behind.
+        """
+        path = self.path(key, extension)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        size = 0
+        complete = False
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+                    yield chunk
+            os.replace(tmp_path, path)
+            complete = True
+        finally:
+            if not complete:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+        self._added(size)
+
+    def store(self, key, chunks, extension='mp3'):
+        for _ in self.write_through(key, chunks, extension):
+            pass
+
+    def _scan(self):
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _added(self, size):
+        with self._lock:
+            if self._size is None:
+                self._size = sum(entry[1] for entry in self._scan())
+            else:
+                self._size += size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Other workers share the directory, so re-read it rather than trusting our count
+        entries = sorted(self._scan())
+        self._size = sum(entry[1] for entry in entries)
+        # Leave some headroom so every new file does not trigger another scan
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if self._size <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._size -= size
+            self.evictions += 1
+        logging.info(f"Evicted audio down to {self._size} bytes")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'bytes': self._size,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions
+        }
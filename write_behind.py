@@ -0,0 +1,255 @@
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import bindparam
+from sqlalchemy.exc import OperationalError
+
+from extensions import db
+from models import QA, Conversation, ResponseFeedback
+
+
+class WriteBehindQueue:
+    """Buffer per-request bookkeeping writes and apply them in batches.
+
+    Request handlers enqueue conversation rows, feedback rows and
+    ``times_asked`` increments instead of committing them. A background thread
+    drains the queue every ``flush_interval`` seconds (or as soon as
+    ``batch_size`` items are waiting), coalesces the counters per QA and writes
+    everything in one transaction, so SQLite's write lock is taken once per
+    batch instead of several times per request.
+    """
+
+    def __init__(self, app, max_size=10000, flush_interval=0.2, batch_size=500,
+                 put_timeout=1.0, max_retries=3):
+        self.app = app
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.put_timeout = put_timeout
+        self.max_retries = max_retries
+        self.queue = queue.Queue(maxsize=max_size)
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_flush_ms = 0.0
+        self._flush_hooks = []
+        self._thread = None
+        self._stopping = threading.Event()
+        self._start_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # Records enqueued but not yet written, including a batch the writer
+        # thread has taken off the queue; flush() waits for it to reach zero
+        self._pending = 0
+        self._idle = threading.Condition()
+
+    def add_flush_hook(self, hook):
+        """Call ``hook(conn, conversations, feedbacks)`` inside every flush transaction"""
+        self._flush_hooks.append(hook)
+
+    def record_asked(self, qa_id):
+        self._put(('asked', qa_id))
+
+    def record_conversation(self, session_id, user_message, bot_response, user_language='en', response_time=None,
+                            prompt_tokens=None, completion_tokens=None):
+        self._put(('conversation', {
+            'session_id': session_id,
+            'user_message': user_message,
+            'bot_response': bot_response,
+            'user_language': user_language,
+            'response_time': response_time,
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'created_at': datetime.utcnow()
+        }))
+
+    def record_feedback(self, qa_id, is_positive, session_id=None, metadata=None):
+        self._put(('feedback', {
+            'qa_id': qa_id,
+            'is_positive': bool(is_positive),
+            'session_id': session_id,
+            'feedback_metadata': metadata,
+            'created_at': datetime.utcnow()
+        }))
+
+    def _put(self, item):
+        self.start()
+        with self._idle:
+            self._pending += 1
+        try:
+            # A full queue means the writer is behind; wait briefly rather than
+            # letting memory grow without bound
+            self.queue.put(item, timeout=self.put_timeout)
+            self.enqueued += 1
+        except queue.Full:
+            self._done(1)
+            self.dropped += 1
+            logging.error(f"Write-behind queue full, dropped {item[0]} record")
+
+    def start(self):
+        """Start the writer thread; called lazily so it is created after any fork"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        with self.app.app_context():
+            self._drain_until_stopped()
+
+    def _drain_until_stopped(self):
+        while not self._stopping.is_set():
+            try:
+                first = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            # Let a batch build up for one interval before writing
+            deadline = time.monotonic() + self.flush_interval
+            batch = [first]
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            with self._flush_lock:
+                self._write(batch)
+            self._done(len(batch))
+
+    def flush(self, timeout=5.0):
+        """Write everything queued so far (needs an app context).
+
+        Queued records are written from the calling thread; a batch the writer
+        thread has already dequeued is waited for, up to ``timeout`` seconds.
+        """
+        with self._flush_lock:
+            while True:
+                batch = []
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    break
+                self._write(batch)
+                self._done(len(batch))
+        with self._idle:
+            if not self._idle.wait_for(lambda: self._pending <= 0, timeout):
+                logging.warning(f"Write-behind flush timed out with {self._pending} records unwritten")
+
+    def _done(self, count):
+        with self._idle:
+            self._pending -= count
+            if self._pending <= 0:
+                self._idle.notify_all()
+
+    def stop(self, timeout=5.0):
+        """Stop the writer and flush what is left; registered with atexit"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        with self.app.app_context():
+            self.flush()
+
+    def _write(self, batch):
+        asked = Counter()
+        positive = Counter()
+        negative = Counter()
+        conversations = []
+        feedbacks = []
+        for kind, payload in batch:
+            if kind == 'asked':
+                asked[payload] += 1
+            elif kind == 'conversation':
+                conversations.append(payload)
+            elif kind == 'feedback':
+                feedbacks.append(payload)
+                if payload['is_positive']:
+                    positive[payload['qa_id']] += 1
+                else:
+                    negative[payload['qa_id']] += 1
+
+        start = time.perf_counter()
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                self._apply(asked, positive, negative, conversations, feedbacks)
+                break
+            except OperationalError as e:
+                # Most likely "database is locked" by another process
+                if attempt == self.max_retries:
+                    self.failed += len(batch)
+                    logging.error(f"Write-behind flush of {len(batch)} records failed: {e}")
+                    return
+                time.sleep(0.05 * attempt)
+            except Exception as e:
+                self.failed += len(batch)
+                logging.error(f"Write-behind flush of {len(batch)} records failed: {e}")
+                return
+        self.batches += 1
+        self.written += len(batch)
+        self.last_flush_ms = (time.perf_counter() - start) * 1000
+
+    def _apply(self, asked, positive, negative, conversations, feedbacks):
+        # A connection of its own, so a flush never touches a request's session
+        table = QA.__table__
+        with db.engine.begin() as conn:
+            if conversations:
+                conn.execute(Conversation.__table__.insert(), conversations)
+            if feedbacks:
+                conn.execute(ResponseFeedback.__table__.insert(), feedbacks)
+            if asked:
+                conn.execute(
+                    table.update()
+                    .where(table.c.id == bindparam('qa_id'))
+                    .values(times_asked=db.func.coalesce(table.c.times_asked, 0) + bindparam('count')),
+                    [{'qa_id': qa_id, 'count': count} for qa_id, count in asked.items()]
+                )
+            if positive or negative:
+                qa_ids = set(positive) | set(negative)
+                rows = conn.execute(
+                    db.select([table.c.id, table.c.positive_feedback, table.c.negative_feedback])
+                    .where(table.c.id.in_(qa_ids))
+                ).fetchall()
+                updates = []
+                for row in rows:
+                    pos = (row.positive_feedback or 0) + positive[row.id]
+                    neg = (row.negative_feedback or 0) + negative[row.id]
+                    updates.append({
+                        'qa_id': row.id,
+                        'pos': pos,
+                        'neg': neg,
+                        'score': QA.compute_priority_score(pos, neg)
+                    })
+                if updates:
+                    conn.execute(
+                        table.update()
+                        .where(table.c.id == bindparam('qa_id'))
+                        .values(positive_feedback=bindparam('pos'),
+                                negative_feedback=bindparam('neg'),
+                                priority_score=bindparam('score')),
+                        updates
+                    )
+            for hook in self._flush_hooks:
+                hook(conn, conversations, feedbacks)
+
+    def stats(self):
+        return {
+            'queue_depth': self.queue.qsize(),
+            'queue_capacity': self.queue.maxsize,
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'batches': self.batches,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'last_flush_ms': round(self.last_flush_ms, 2)
+        }